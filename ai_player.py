@@ -2,6 +2,97 @@ import numpy as np
 import math
 import pickle
 import os
+import zipfile
+import kernels
+from checkpoint import SCHEMA_VERSION, write_checkpoint, read_checkpoint, encode_json, decode_json
+from game_bitboard import ROW_MASK, UniformBuffer, transpose, exponents_to_bitboard, bitboard_to_exponents
+from transposition_table import TranspositionTable
+from game_2048 import Game2048
+from expectimax import ExpectimaxSearch
+from parallel_search import ParallelExpectimaxSearch
+from ntuple import NTupleNetwork
+
+# Pary sąsiednich pól planszy 4x4 (indeksy płaskie): najpierw poziome, potem pionowe.
+_NEIGHBOR_PAIRS = [(i, i + 1) for i in range(16) if i % 4 != 3] + \
+                  [(i, i + 4) for i in range(12)]
+
+# Sąsiedzi każdego pola w kolejności: góra, dół, lewo, prawo.
+_CELL_NEIGHBORS = [
+    [(r + dr) * 4 + (c + dc) for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+     if 0 <= r + dr < 4 and 0 <= c + dc < 4]
+    for r in range(4) for c in range(4)
+]
+
+# Te same dane w postaci tablic numpy dla wersji wsadowych (`evaluate_many`).
+_PAIR_FIRST = np.array([i for i, _ in _NEIGHBOR_PAIRS])
+_PAIR_SECOND = np.array([j for _, j in _NEIGHBOR_PAIRS])
+_NEIGHBOR_MATRIX = np.zeros((16, 16), dtype=np.int64)
+for _pos, _neighbors in enumerate(_CELL_NEIGHBORS):
+    _NEIGHBOR_MATRIX[_pos, _neighbors] = 1
+_PAIR_CELLS = np.zeros((len(_NEIGHBOR_PAIRS), 16), dtype=np.int64)
+_PAIR_CELLS[np.arange(len(_NEIGHBOR_PAIRS)), _PAIR_FIRST] = 1
+_PAIR_CELLS[np.arange(len(_NEIGHBOR_PAIRS)), _PAIR_SECOND] = 1
+
+# Górne ograniczenia cech z `get_features` (dolne to 0) i kar: gładkość >= -15 na parę,
+# izolacja <= 16 pól.
+_FEATURE_MAX = np.array([1.0, 15 / 16.0, 15 * 120 / 1000.0, 1.0, 1.0, 1.0])
+_SMOOTHNESS_MIN = -15 * len(_NEIGHBOR_PAIRS)
+_ISOLATION_MAX = 16
+
+# Pola planszy uporządkowane ćwiartkami 2x2 (strata dla próbkowania 'stratified').
+_QUADRANT_ORDER = sorted(range(16), key=lambda i: ((i // 8) * 2 + (i % 4) // 2, i))
+
+# Współdzielony generator próbkowania dla graczy tworzonych bez ziarna.
+_SHARED_RNG = UniformBuffer()
+
+
+def _build_line_tables():
+    """
+    Prekalkuluje składniki heurystyki dla wszystkich 65536 linii (wiersz/kolumna) planszy.
+
+    Linia to 4 wykładniki po 4 bity (pole 0 w najmłodszych bitach),
+    tak jak w tablicach ruchów `game_bitboard`.
+
+    Returns:
+        dict: Tablice numpy (65536,) indeksowane kluczem linii:
+            empty - liczba pustych pól,
+            merges - liczba par sąsiadów do połączenia,
+            smoothness - ujemna suma różnic między niepustymi sąsiadami,
+            has_row / has_col - maska pól z identycznym sąsiadem w linii
+            (bity 0-3 dla wiersza, bity 0/4/8/12 dla kolumny),
+            nonzero - maska niepustych pól (bity 0-3),
+            max / argmax - największy wykładnik i jego pierwsza pozycja.
+    """
+    keys = np.arange(65536)
+    line = (keys[:, None] >> np.array([0, 4, 8, 12])) & 0xF
+    a, b = line[:, :-1], line[:, 1:]
+    both = (a > 0) & (b > 0)
+    equal = both & (a == b)
+
+    has_neighbor = np.zeros(line.shape, dtype=bool)
+    has_neighbor[:, :-1] |= equal
+    has_neighbor[:, 1:] |= equal
+
+    return {
+        'empty': (line == 0).sum(axis=1),
+        'merges': equal.sum(axis=1),
+        'smoothness': -(np.abs(a - b) * both).sum(axis=1),
+        'has_row': has_neighbor @ (1 << np.arange(4)),
+        'has_col': has_neighbor @ (1 << (4 * np.arange(4))),
+        'nonzero': (line > 0) @ (1 << np.arange(4)),
+        'max': line.max(axis=1),
+        'argmax': line.argmax(axis=1),
+    }
+
+
+_LINE_TABLES = _build_line_tables()
+_LINE_EMPTY = _LINE_TABLES['empty'].tolist()
+_LINE_MERGES = _LINE_TABLES['merges'].tolist()
+_LINE_HAS_ROW = _LINE_TABLES['has_row'].tolist()
+_LINE_HAS_COL = _LINE_TABLES['has_col'].tolist()
+_LINE_NONZERO = _LINE_TABLES['nonzero'].tolist()
+_LINE_MAX = _LINE_TABLES['max'].tolist()
+_LINE_ARGMAX = _LINE_TABLES['argmax'].tolist()
 
 
 class AIPlayer:
@@ -17,9 +108,38 @@ class AIPlayer:
         weights_panic (np.ndarray): Wagi cech dla trybu paniki.
         alpha (float): Współczynnik uczenia.
         gradients (list): Prekalkulowane maski gradientów (Snake).
+        rng (UniformBuffer): Generator próbkowania pól w `get_expected_value`
+            (bez ziarna - współdzielony `_SHARED_RNG`).
+        sample_count (int): Liczba losowanych pól w węźle losowym.
+        sample_scheme (str): Sposób próbkowania: 'uniform' (bez zwracania),
+            'stratified' (po jednym polu z każdej grupy ćwiartek planszy, ważone
+            liczebnością grupy) albo 'all' (wszystkie puste pola).
+        evaluator (str): Tryb `evaluate`: 'fused' (jednoprzebiegowy) albo 'lut'
+            (tablice wierszy/kolumn, liczone ponownie tylko po zmianie wag).
+        weights_version (int): Licznik zmian wag (przypisań `weights_normal`/`weights_panic`/`ntuple`
+            i aktualizacji sieci n-krotek).
+        ntuple (NTupleNetwork | None): Sieć n-krotek; gdy ustawiona, zastępuje model
+            liniowy w `evaluate`, `get_features` i `update_weights` (cechy to indeksy wag).
+        tt (TranspositionTable | None): Cache ocen `evaluate` (głębokość 0) i
+            `get_expected_value` (głębokość 1); czyszczony przy każdej zmianie wag.
+            Domyślnie wyłączony, patrz `set_cache`.
+        search_backend (str): Silnik `choose_move`: 'sampled' (1 ruch + próbka 3 pól,
+            `get_expected_values`) albo 'expectimax' (`ExpectimaxSearch`).
+        search_depth (int): Maksymalna głębokość dla silnika 'expectimax'.
+        search_workers (int): Liczba procesów dla ruchów korzenia w 'expectimax'
+            (0 lub 1 = w bieżącym procesie, patrz `ParallelExpectimaxSearch`).
+        last_search_stats (dict): Statystyki ostatniego wywołania `choose_move`.
+        checkpoint_config (dict): Konfiguracja treningu z ostatnio wczytanego checkpointu .npz.
+
+    Args:
+        seed (int | np.random.SeedSequence | np.random.Generator, optional):
+            Ziarno generatora (np. dziecko z `SeedSequence.spawn`).
     """
-    def __init__(self):
+    def __init__(self, seed=None):
 
+        self.weights_version = 0
+        self.tt = None
+        self.ntuple = None
         self.weights_normal = np.array([0.5, 0.5, 0.5, 0.5, 0.5, 0.5])
         self.weights_panic  = np.array([0.5, 0.5, 0.5, 0.5, 0.5, 0.5])
 
@@ -28,6 +148,20 @@ class AIPlayer:
 
 
         self.alpha = 0.00025
+        self.rng = _SHARED_RNG if seed is None else UniformBuffer(seed)
+        self.sample_count = 3
+        self.sample_scheme = 'uniform'
+        self.evaluator = 'fused'
+        self._lut_version = None
+        self.search_backend = 'sampled'
+        self.search_depth = 3
+        self.search_workers = 0
+        self.last_search_stats = {}
+        self._sim_game = None
+        self._searcher = None
+        self._searcher_config = None
+        self._lut_gradients = None
+        self.checkpoint_config = {}
 
         base_gradient = np.array([
             [15, 14, 13, 12],
@@ -43,14 +177,63 @@ class AIPlayer:
             self.gradients.append(rot)
             self.gradients.append(np.fliplr(rot))
 
+        self.gradient_matrix = np.array([g.ravel() for g in self.gradients])
+
+    @property
+    def weights_normal(self):
+        """np.ndarray: Wagi cech dla trybu normalnego."""
+        return self._weights_normal
+
+    @weights_normal.setter
+    def weights_normal(self, weights):
+        self._weights_normal = weights
+        self._weights_changed()
+
+    @property
+    def weights_panic(self):
+        """np.ndarray: Wagi cech dla trybu paniki."""
+        return self._weights_panic
+
+    @weights_panic.setter
+    def weights_panic(self, weights):
+        self._weights_panic = weights
+        self._weights_changed()
+
+    @property
+    def ntuple(self):
+        """NTupleNetwork | None: Sieć n-krotek zastępująca model liniowy."""
+        return self._ntuple
+
+    @ntuple.setter
+    def ntuple(self, network):
+        self._ntuple = network
+        self._weights_changed()
+
+    def _weights_changed(self):
+        """Unieważnia wartości zależne od wag (tablice LUT, cache ocen)."""
+        self.weights_version += 1
+        if self.tt is not None:
+            self.tt.clear()
+
+    def set_cache(self, max_mb=64, canonical=False):
+        """
+        Włącza (lub wyłącza dla `max_mb=0`) tablicę transpozycji.
+
+        Args:
+            max_mb (float): Limit pamięci cache w MB.
+            canonical (bool): Czy łączyć 8 symetrycznych wariantów planszy w jeden wpis.
+        """
+        self.tt = TranspositionTable(max_mb, canonical) if max_mb else None
+
     def get_features(self, board):
         """
         Ekstrahuje wektor cech stanu planszy.
 
         Oblicza 6 kluczowych metryk znormalizowanych do zakresu używalnego przez sieć.
+        Plansza wykładników jest już "zlogarytmowana", więc nie liczymy log2.
 
         Args:
-            board (np.ndarray): Aktualna plansza gry.
+            board (np.ndarray): Aktualna plansza gry jako wykładniki (uint8, 0 = puste pole).
 
         Returns:
             np.ndarray: Wektor 6 cech:
@@ -60,18 +243,20 @@ class AIPlayer:
                 3. Merges Available
                 4. Corner Position (czy max jest w rogu?)
                 5. Neighbor Bonus (czy duzi sąsiedzi są obok?)
+            Przy włączonej sieci n-krotek (`ntuple`) - wektor indeksów jej wag.
         """
+        if self.ntuple is not None:
+            return self.ntuple.indices(board)
 
-        board_log = np.zeros_like(board, dtype=float)
-        mask = board > 0
-        board_log[mask] = np.log2(board[mask])
-
+        jit = kernels.active()
+        if jit is not None:
+            return jit.board_terms(board.ravel(), self.gradient_matrix)[0]
 
         empty = len(board[board == 0]) / 16.0
 
-        max_val_norm = np.max(board_log) / 16.0 
+        max_val_norm = np.max(board) / 16.0 
 
-        gradient_scores = [np.sum(board_log * g) for g in self.gradients]
+        gradient_scores = [np.sum(board * g) for g in self.gradients]
         best_gradient = max(gradient_scores) / 1000.0
 
         merges_h = (board[:, :-1] == board[:, 1:]) & (board[:, :-1] != 0)
@@ -91,7 +276,7 @@ class AIPlayer:
             nr, nc = r + dr, c + dc
             if 0 <= nr < 4 and 0 <= nc < 4:
                 if board[nr, nc] > 0:
-                    neighbor_bonus += board_log[nr, nc]
+                    neighbor_bonus += board[nr, nc]
 
         neighbor_norm = min(neighbor_bonus / 40.0, 1.0)
 
@@ -104,7 +289,7 @@ class AIPlayer:
         Wersja ZWEKTORYZOWANA (Błyskawiczna). Zamiast pętli, używamy operacji na całych macierzach.
         
         Args:
-            board (np.ndarray): Plansza gry.
+            board (np.ndarray): Plansza gry (wykładniki).
             
         Returns:
             float: Ujemna wartość (kara), im mniejsza różnica, tym bliżej 0.
@@ -113,14 +298,15 @@ class AIPlayer:
         Wersja ZWEKTORYZOWANA (Błyskawiczna).
         Zamiast pętli, używamy operacji na całych macierzach.
         """
+        jit = kernels.active()
+        if jit is not None:
+            return jit.board_terms(board.ravel(), self.gradient_matrix)[2]
 
         mask = board > 0
         if not np.any(mask):
             return 0
 
-        board_log = np.zeros_like(board, dtype=float)
-
-        board_log[mask] = np.log2(board[mask])
+        board_log = board.astype(np.int16)
 
         smoothness = 0
 
@@ -143,7 +329,7 @@ class AIPlayer:
         Wersja ZWEKTORYZOWANA. Sprawdza izolację bez ani jednej pętli for.
 
         Args:
-            board (np.ndarray): Plansza gry.
+            board (np.ndarray): Plansza gry (wykładniki).
 
         Returns:
             int: Liczba klocków, które nie mają żadnego pasującego sąsiada.
@@ -152,6 +338,9 @@ class AIPlayer:
         Wersja ZWEKTORYZOWANA.
         Sprawdza izolację bez ani jednej pętli for.
         """
+        jit = kernels.active()
+        if jit is not None:
+            return jit.board_terms(board.ravel(), self.gradient_matrix)[3]
         has_neighbor = np.zeros(board.shape, dtype=bool)
 
 
@@ -182,8 +371,407 @@ class AIPlayer:
         - Smoothness (Gładkość)
         - Isolation (Izolacja)
 
+        Przy włączonej sieci n-krotek (`ntuple`) zwraca jej wartość.
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+
+        Returns:
+            float: Wartość oceny stanu (Score).
+        """
+        if self.tt is None:
+            return self._evaluate_uncached(board)
+
+        key = self.tt.key(exponents_to_bitboard(board))
+        value = self.tt.get(key)
+        if value is None:
+            value = self._evaluate_uncached(board)
+            self.tt.put(key, value)
+        return value
+
+    def _evaluate_uncached(self, board):
+        """
+        Liczy `evaluate` bez udziału cache (sieć n-krotek albo model liniowy wg `evaluator`).
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+
+        Returns:
+            float: Wartość oceny stanu (Score).
+        """
+        if self.ntuple is not None:
+            return self.ntuple.value(board)
+        if self.evaluator == 'lut':
+            return self.evaluate_bitboard(exponents_to_bitboard(board))
+        return self._evaluate_fused(board)
+
+    def _evaluate_fused(self, board):
+        """
+        Ocena planszy jednym przebiegiem po parach sąsiadów (tryb 'fused').
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+
+        Returns:
+            float: Wartość oceny stanu (Score).
+        """
+        features, empty_cells_count, smoothness, isolation = self._fused_terms(board)
+
+        if empty_cells_count < 4:
+            base_score = np.dot(self.weights_panic, features)
+            smoothness_weight = 2
+            isolation_weight = 10
+        else:
+            base_score = np.dot(self.weights_normal, features)
+            smoothness_weight = 1
+            isolation_weight = 5
+
+        return base_score + \
+               (smoothness * smoothness_weight) - \
+               (isolation * isolation_weight)
+
+    def _fused_terms(self, board):
+        """
+        Liczy wszystkie składniki oceny w jednym przebiegu po 16 polach.
+
+        Cechy z `get_features`, gładkość i izolacja korzystają z tej samej
+        listy par sąsiadów (poziomych i pionowych), a liczba pustych pól
+        jest liczona tylko raz. Wyniki są identyczne z osobnymi metodami.
+
+        Args:
+            board (np.ndarray): Plansza gry 4x4 (wykładniki).
+
+        Returns:
+            tuple: (wektor_cech, liczba_pustych, gładkość, izolacja)
+        """
+        jit = kernels.active()
+        if jit is not None:
+            return jit.board_terms(board.ravel(), self.gradient_matrix)
+
+        flat = board.ravel().tolist()
+
+        merges = 0
+        smoothness = 0
+        has_neighbor = [False] * 16
+        for i, j in _NEIGHBOR_PAIRS:
+            a = flat[i]
+            b = flat[j]
+            if a and b:
+                if a == b:
+                    merges += 1
+                    has_neighbor[i] = True
+                    has_neighbor[j] = True
+                else:
+                    smoothness -= abs(a - b)
+
+        isolation = 0
+        for i in range(16):
+            if flat[i] and not has_neighbor[i]:
+                isolation += 1
+
+        empty_count = flat.count(0)
+        max_val = max(flat)
+        max_pos = flat.index(max_val)
+        r, c = divmod(max_pos, 4)
+        is_corner = 1.0 if (r == 0 or r == 3) and (c == 0 or c == 3) else 0.0
+
+        neighbor_bonus = 0.0
+        for n in _CELL_NEIGHBORS[max_pos]:
+            neighbor_bonus += flat[n]
+
+        best_gradient = (self.gradient_matrix @ board.ravel()).max() / 1000.0
+
+        features = np.array([
+            empty_count / 16.0,
+            max_val / 16.0,
+            best_gradient,
+            min(merges / 10.0, 1.0),
+            is_corner,
+            min(neighbor_bonus / 40.0, 1.0)
+        ])
+        return features, empty_count, smoothness, isolation
+
+    def _terms_many(self, boards):
+        """
+        Wsadowa wersja `_fused_terms` dla stosu plansz.
+
+        Args:
+            boards (np.ndarray): Plansze (N, 4, 4) jako wykładniki.
+
+        Returns:
+            tuple: (cechy (N, 6), liczba_pustych (N,), gładkość (N,), izolacja (N,))
+        """
+        flat = boards.reshape(len(boards), 16).astype(np.int64)
+
+        a = flat[:, _PAIR_FIRST]
+        b = flat[:, _PAIR_SECOND]
+        both = (a > 0) & (b > 0)
+        equal = both & (a == b)
+        merges = equal.sum(axis=1)
+        smoothness = -(np.abs(a - b) * both).sum(axis=1)
+
+        has_neighbor = equal.astype(np.int64) @ _PAIR_CELLS
+        isolation = ((flat > 0) & (has_neighbor == 0)).sum(axis=1)
+
+        empty_count = (flat == 0).sum(axis=1)
+        max_pos = flat.argmax(axis=1)
+        max_val = flat[np.arange(len(flat)), max_pos]
+        r, c = np.divmod(max_pos, 4)
+        is_corner = (((r == 0) | (r == 3)) & ((c == 0) | (c == 3))).astype(float)
+        neighbor_bonus = (flat * _NEIGHBOR_MATRIX[max_pos]).sum(axis=1)
+        best_gradient = (flat @ self.gradient_matrix.T).max(axis=1) / 1000.0
+
+        features = np.empty((len(flat), 6))
+        features[:, 0] = empty_count / 16.0
+        features[:, 1] = max_val / 16.0
+        features[:, 2] = best_gradient
+        features[:, 3] = np.minimum(merges / 10.0, 1.0)
+        features[:, 4] = is_corner
+        features[:, 5] = np.minimum(neighbor_bonus / 40.0, 1.0)
+        return features, empty_count, smoothness, isolation
+
+    def get_features_many(self, boards):
+        """
+        Wsadowa wersja `get_features`.
+
+        Args:
+            boards (np.ndarray): Plansze (N, 4, 4) jako wykładniki.
+
+        Returns:
+            np.ndarray: Macierz cech (N, 6) albo indeksów wag sieci n-krotek.
+        """
+        if self.ntuple is not None:
+            return self.ntuple.indices_many(boards)
+        return self._terms_many(boards)[0]
+
+    def evaluate_many(self, boards):
+        """
+        Ocenia cały stos plansz jednym wywołaniem (wsadowa wersja `evaluate`).
+
+        Cechy, gładkość, izolacja i wybór wag NORMAL/PANIC są liczone
+        na tablicach (N, ...), bez pętli po planszach.
+
+        Args:
+            boards (np.ndarray): Plansze (N, 4, 4) jako wykładniki.
+
+        Returns:
+            np.ndarray: Wektor N ocen.
+        """
+        if self.ntuple is not None:
+            return self.ntuple.value_many(boards)
+        return self.evaluate_with_features_many(boards)[0]
+
+    def evaluate_with_features_many(self, boards):
+        """
+        Jak `evaluate_many`, ale zwraca też cechy policzone po drodze.
+
+        Cechy można od razu przekazać do `update_weights`, bez ponownego
+        liczenia ich dla wybranej planszy.
+
+        Args:
+            boards (np.ndarray): Plansze (N, 4, 4) jako wykładniki.
+
+        Returns:
+            tuple: (wektor N ocen, cechy (N, 6) albo indeksy wag sieci n-krotek)
+        """
+        if self.ntuple is not None:
+            indices = self.ntuple.indices_many(boards)
+            return self.ntuple.weights[indices].sum(axis=1, dtype=np.float64), indices
+
+        features, empty_count, smoothness, isolation = self._terms_many(boards)
+
+        panic = empty_count < 4
+        weights = np.where(panic[:, None], self.weights_panic, self.weights_normal)
+        smoothness_weight = np.where(panic, 2, 1)
+        isolation_weight = np.where(panic, 10, 5)
+
+        values = (features * weights).sum(axis=1) + \
+                 smoothness * smoothness_weight - \
+                 isolation * isolation_weight
+        return values, features
+
+    def evaluate_afterstates(self, board):
+        """
+        Ocenia plansze po każdym legalnym ruchu (bez losowego kafelka) jednym wywołaniem.
+
+        Podstawa uczenia na stanach po ruchu (afterstate TD): wartości i cechy
+        wybranego ruchu są potem użyte wprost w `update_weights`.
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+
+        Returns:
+            tuple: (ruchy, nagrody_punktowe, wartości, cechy) - listy/tablice
+                w kolejności ruchów; cechy to None, gdy brak legalnych ruchów.
+        """
+        sim_game = self._simulation()
+        sim_game.load_state(board)
+        valid_moves = sim_game.get_valid_moves()
+        if not valid_moves:
+            return [], [], np.empty(0), None
+
+        afterstates = np.empty((len(valid_moves), 4, 4), dtype=np.uint8)
+        rewards = []
+        for i, move in enumerate(valid_moves):
+            reward, _ = sim_game.push_move(move)
+            afterstates[i] = sim_game.exponents
+            rewards.append(reward)
+            sim_game.pop_state()
+
+        values, features = self.evaluate_with_features_many(afterstates)
+        return valid_moves, rewards, values, features
+
+    def _simulation(self):
+        """Zwraca (tworząc przy pierwszym użyciu) własną grę do symulacji ruchów."""
+        if self._sim_game is None:
+            self._sim_game = Game2048()
+        return self._sim_game
+
+    def value_bounds(self):
+        """
+        Zwraca przedział, w którym mieści się każda wartość `evaluate` przy bieżących wagach.
+
+        Ograniczenia wynikają z zakresów cech, gładkości i izolacji w obu trybach
+        (NORMAL i PANIC). Używane przez przycinanie Star1 w `ExpectimaxSearch`.
+
+        Returns:
+            tuple: (dolne_ograniczenie, górne_ograniczenie)
+        """
+        if self.ntuple is not None:
+            return self.ntuple.bounds()
+
+        low, high = float('inf'), -float('inf')
+        for weights, smoothness_weight, isolation_weight in [(self.weights_normal, 1, 5),
+                                                             (self.weights_panic, 2, 10)]:
+            terms = np.asarray(weights) * _FEATURE_MAX
+            high = max(high, float(np.maximum(terms, 0).sum()))
+            low = min(low, float(np.minimum(terms, 0).sum()) +
+                      smoothness_weight * _SMOOTHNESS_MIN - isolation_weight * _ISOLATION_MAX)
+        return low, high
+
+    def _build_lut(self):
+        """
+        Buduje tablice liniowych składników oceny dla trybów NORMAL i PANIC.
+
+        Dla każdego trybu wiersz dostaje wkład pustych pól (waga cechy 0)
+        i gładkości poziomej, a kolumna wkład gładkości pionowej. Tablice są
+        przeliczane tylko wtedy, gdy zmieni się `weights_version`.
+        """
+        empty = _LINE_TABLES['empty']
+        smoothness = _LINE_TABLES['smoothness']
+        self._lut_rows = []
+        self._lut_cols = []
+        self._lut_weights = []
+        for weights, smoothness_weight in [(self.weights_normal, 1), (self.weights_panic, 2)]:
+            self._lut_rows.append((weights[0] * empty / 16.0 + smoothness_weight * smoothness).tolist())
+            self._lut_cols.append((smoothness_weight * smoothness).tolist())
+            self._lut_weights.append([float(w) for w in weights])
+        self._lut_version = self.weights_version
+
+        if self._lut_gradients is None:
+            self._lut_gradients = self._build_gradient_lut()
+
+    def _build_gradient_lut(self):
+        """
+        Pakuje wkład każdego wiersza do 8 gradientów w jedną liczbę całkowitą.
+
+        Gradient `k` zajmuje 12 bitów od pozycji `12 * k`; suma 4 wierszy
+        nie przekracza 15 * 120 < 4096, więc pola się nie przenoszą.
+
+        Returns:
+            list: 4 listy (po jednej na wiersz) po 65536 spakowanych sum.
+        """
+        line = (np.arange(65536)[:, None] >> np.array([0, 4, 8, 12])) & 0xF
+        shifts = np.arange(4, dtype=np.int64) * 12
+        tables = []
+        for r in range(4):
+            sums = line @ self.gradient_matrix[:, 4 * r:4 * r + 4].T
+            low = (sums[:, :4] << shifts).sum(axis=1).tolist()
+            high = (sums[:, 4:] << shifts).sum(axis=1).tolist()
+            tables.append([lo | (hi << 48) for lo, hi in zip(low, high)])
+        return tables
+
+    def evaluate_bitboard(self, bb):
+        """
+        Ocena stanu na podstawie tablic wierszy i kolumn (tryb 'lut').
+
+        Puste pola, połączenia, gładkość i izolacja to 8 odczytów z tablic
+        (4 wiersze + 4 kolumny); osobno liczone są tylko cechy globalne:
+        max klocek, róg i sąsiedzi maksa; gradienty (Snake) też są sumą
+        4 odczytów wierszowych, spakowanych po 8 w jednej liczbie.
+        Wynik jest równy `evaluate` z dokładnością do zaokrągleń float.
+
+        Args:
+            bb (int): Plansza spakowana do 64 bitów.
+
+        Returns:
+            float: Wartość oceny stanu (Score).
+        """
+        if self.ntuple is not None:
+            return self.ntuple.value(bitboard_to_exponents(bb))
+        if self._lut_version != self.weights_version:
+            self._build_lut()
+
+        t = transpose(bb)
+        rows = (bb & ROW_MASK, (bb >> 16) & ROW_MASK, (bb >> 32) & ROW_MASK, bb >> 48)
+        c0, c1, c2, c3 = t & ROW_MASK, (t >> 16) & ROW_MASK, (t >> 32) & ROW_MASK, t >> 48
+        r0, r1, r2, r3 = rows
+
+        empty_count = _LINE_EMPTY[r0] + _LINE_EMPTY[r1] + _LINE_EMPTY[r2] + _LINE_EMPTY[r3]
+        if empty_count < 4:
+            mode, isolation_weight = 1, 10
+        else:
+            mode, isolation_weight = 0, 5
+        row_lut = self._lut_rows[mode]
+        col_lut = self._lut_cols[mode]
+        w = self._lut_weights[mode]
+
+        linear = row_lut[r0] + row_lut[r1] + row_lut[r2] + row_lut[r3] + \
+                 col_lut[c0] + col_lut[c1] + col_lut[c2] + col_lut[c3]
+        merges = _LINE_MERGES[r0] + _LINE_MERGES[r1] + _LINE_MERGES[r2] + _LINE_MERGES[r3] + \
+                 _LINE_MERGES[c0] + _LINE_MERGES[c1] + _LINE_MERGES[c2] + _LINE_MERGES[c3]
+
+        has_neighbor = _LINE_HAS_ROW[r0] | (_LINE_HAS_ROW[r1] << 4) | \
+                       (_LINE_HAS_ROW[r2] << 8) | (_LINE_HAS_ROW[r3] << 12) | \
+                       _LINE_HAS_COL[c0] | (_LINE_HAS_COL[c1] << 1) | \
+                       (_LINE_HAS_COL[c2] << 2) | (_LINE_HAS_COL[c3] << 3)
+        nonzero = _LINE_NONZERO[r0] | (_LINE_NONZERO[r1] << 4) | \
+                  (_LINE_NONZERO[r2] << 8) | (_LINE_NONZERO[r3] << 12)
+        isolation = bin(nonzero & ~has_neighbor).count('1')
+
+        row_max = [_LINE_MAX[r] for r in rows]
+        max_val = max(row_max)
+        r = row_max.index(max_val)
+        max_pos = 4 * r + _LINE_ARGMAX[rows[r]]
+        c = max_pos & 3
+        is_corner = 1.0 if (r == 0 or r == 3) and (c == 0 or c == 3) else 0.0
+
+        neighbor_bonus = 0
+        for n in _CELL_NEIGHBORS[max_pos]:
+            neighbor_bonus += (bb >> (4 * n)) & 0xF
+
+        g0, g1, g2, g3 = self._lut_gradients
+        g = g0[r0] + g1[r1] + g2[r2] + g3[r3]
+        best_gradient = max(g & 0xFFF, (g >> 12) & 0xFFF, (g >> 24) & 0xFFF, (g >> 36) & 0xFFF,
+                            (g >> 48) & 0xFFF, (g >> 60) & 0xFFF, (g >> 72) & 0xFFF, g >> 84) / 1000.0
+
+        return linear + \
+               w[1] * (max_val / 16.0) + \
+               w[2] * best_gradient + \
+               w[3] * min(merges / 10.0, 1.0) + \
+               w[4] * is_corner + \
+               w[5] * min(neighbor_bonus / 40.0, 1.0) - \
+               isolation * isolation_weight
+
+    def _evaluate_reference(self, board):
+        """
+        Referencyjna (wolniejsza) ścieżka oceny złożona z osobnych metod.
+
+        Służy do sprawdzania, że `evaluate` daje dokładnie ten sam wynik
+        (patrz `check_evaluators`).
+
         Args:
-            board (np.ndarray): Plansza gry.
+            board (np.ndarray): Plansza gry (wykładniki).
 
         Returns:
             float: Wartość oceny stanu (Score).
@@ -221,82 +809,310 @@ class AIPlayer:
         Decyduje, który zestaw wag (Normal czy Panic) przyczynił się do wyniku
         i aktualizuje tylko ten zestaw.
 
+        Dla sieci n-krotek `features_state` to indeksy wag z `get_features`,
+        a aktualizacja dotyczy tylko odczytanych wag.
+
         Args:
             features_state (np.ndarray): Wektor cech stanu przed ruchem.
             td_error (float): Błąd predykcji czasowej (Target - Prediction).
         """
+        if self.ntuple is not None:
+            self.ntuple.update(features_state, td_error)
+            self._weights_changed()
+            return
+
         empty_ratio = features_state[0]
         empty_count = empty_ratio * 16.0
 
         td_error_clipped = np.clip(td_error, -10, 10)
         delta = self.alpha * td_error_clipped * features_state
 
-        if empty_count < 3.99:
-            self.weights_panic += delta
-            self.weights_panic = np.maximum(self.weights_panic, 0.0)
-        else:
-            self.weights_normal += delta
-            self.weights_normal = np.maximum(self.weights_normal, 0.0)
+        # Aktualizacja w miejscu: wagi mogą leżeć w pamięci współdzielonej (trening równoległy).
+        weights = self.weights_panic if empty_count < 3.99 else self.weights_normal
+        weights += delta
+        np.maximum(weights, 0.0, out=weights)
+        self._weights_changed()
+
+    def update_weights_many(self, features, td_errors):
+        """
+        Zsumowana aktualizacja TD dla partii stanów (jeden zapis wag na partię).
+
+        Odpowiada kolejnym wywołaniom `update_weights` dla wszystkich wierszy,
+        z tą różnicą, że przycięcie wag do zera następuje raz, po zsumowaniu
+        zmian każdej fazy (NORMAL/PANIC).
+
+        Args:
+            features (np.ndarray): Cechy stanów (B, 6) albo indeksy sieci n-krotek (B, lookups).
+            td_errors (np.ndarray): Błędy predykcji czasowej (B,).
+        """
+        if len(td_errors) == 0:
+            return
+        if self.ntuple is not None:
+            self.ntuple.update_many(features, td_errors)
+            self._weights_changed()
+            return
+
+        td_errors_clipped = np.clip(td_errors, -10, 10)
+        panic = features[:, 0] * 16.0 < 3.99
+        for weights, rows in ((self.weights_panic, panic), (self.weights_normal, ~panic)):
+            if rows.any():
+                weights += self.alpha * (td_errors_clipped[rows] @ features[rows])
+                np.maximum(weights, 0.0, out=weights)
+        self._weights_changed()
 
     def get_expected_value(self, board):
         """
         Oblicza wartość oczekiwaną stanu (Expectimax 1-step).
         
         Symuluje losowe pojawienie się kafelka (2 lub 4) w wolnych miejscach
-        i uśrednia wynik oceny dla tych możliwości.
+        (wybranych wg `sample_count` i `sample_scheme`) i uśrednia wynik oceny
+        dla tych możliwości. Przy włączonym cache
+        (`set_cache`) wynik próbkowania jest zapamiętywany dla danej planszy.
 
         Args:
-            board (np.ndarray): Stan planszy PO ruchu gracza (przed pojawieniem się losowego kafelka).
+            board (np.ndarray): Stan planszy (wykładniki) PO ruchu gracza (przed pojawieniem się losowego kafelka).
 
         Returns:
             float: Uśredniona wartość oceny stanu.
         """
-        empty_cells = list(zip(*np.where(board == 0)))
-        if not empty_cells:
-            return self.evaluate(board)
+        if self.tt is not None:
+            key = self.tt.key(exponents_to_bitboard(board), 1)
+            value = self.tt.get(key)
+            if value is None:
+                value = self._expected_value(board)
+                self.tt.put(key, value)
+            return value
+        return self._expected_value(board)
+
+    def _expected_value(self, board):
+        """
+        Liczy `get_expected_value` bez udziału cache.
 
-        if len(empty_cells) > 3:
-            indices = np.random.choice(len(empty_cells), 3, replace=False)
-            sample_cells = [empty_cells[i] for i in indices]
-        else:
-            sample_cells = empty_cells
+        Args:
+            board (np.ndarray): Stan planszy (wykładniki) po ruchu gracza.
+
+        Returns:
+            float: Uśredniona wartość oceny stanu.
+        """
+        sample_cells, cell_weights = self._sample_cells(board)
+        if not sample_cells:
+            return self.evaluate(board)
 
         total_val = 0
-        for r, c in sample_cells:
+        for cell, weight in zip(sample_cells, cell_weights):
+            r, c = divmod(cell, 4)
             # 2 (90%)
-            board[r, c] = 2
+            board[r, c] = 1
             v2 = self.evaluate(board)
             # 4 (10%)
-            board[r, c] = 4
+            board[r, c] = 2
             v4 = self.evaluate(board)
             board[r, c] = 0 
 
-            total_val += (0.9 * v2 + 0.1 * v4)
+            total_val += weight * (0.9 * v2 + 0.1 * v4)
+
+        return total_val
+
+    def _sample_cells(self, board):
+        """
+        Wybiera puste pola do uśrednienia w węźle losowym (wg `sample_scheme`).
+
+        Args:
+            board (np.ndarray): Plansza 4x4 (wykładniki).
 
-        return total_val / len(sample_cells)
+        Returns:
+            tuple: (lista indeksów płaskich pól, lista wag sumujących się do 1);
+                puste listy, gdy plansza nie ma wolnych pól.
 
+        Raises:
+            ValueError: Dla nieznanego `sample_scheme`.
+        """
+        flat = board.ravel().tolist()
+        k = self.sample_count
+        if 0 not in flat:
+            return [], []
+
+        if self.sample_scheme == 'stratified':
+            empty_cells = [i for i in _QUADRANT_ORDER if flat[i] == 0]
+            n = len(empty_cells)
+            if n <= k:
+                return empty_cells, [1.0 / n] * n
+            cells, weights = [], []
+            for s in range(k):
+                lo, hi = s * n // k, (s + 1) * n // k
+                cells.append(empty_cells[lo + int(self.rng.next() * (hi - lo))])
+                weights.append((hi - lo) / n)
+            return cells, weights
+
+        empty_cells = [i for i in range(16) if flat[i] == 0]
+        n = len(empty_cells)
+        if self.sample_scheme == 'all' or n <= k:
+            return empty_cells, [1.0 / n] * n
+        if self.sample_scheme != 'uniform':
+            raise ValueError("Błąd schematu próbkowania")
+
+        for i in range(k):
+            j = i + int(self.rng.next() * (n - i))
+            empty_cells[i], empty_cells[j] = empty_cells[j], empty_cells[i]
+        return empty_cells[:k], [1.0 / k] * k
+
+
+    def get_expected_values(self, afterstates):
+        """
+        Wsadowa wersja `get_expected_value` dla wszystkich stanów po ruchu w danej turze.
+
+        Próbkuje pola dokładnie tak jak `get_expected_value` (te same wywołania `rng`),
+        ale wszystkie wyniki losowania ocenia jednym wywołaniem `evaluate_many`.
+        Nie korzysta z cache `tt`.
+
+        Args:
+            afterstates (list): Plansze (wykładniki) po ruchu gracza, po jednej na ruch.
 
-    def save_model(self, filename, episode_count):
+        Returns:
+            np.ndarray: Wartości oczekiwane, w kolejności `afterstates`.
+        """
+        outcomes = []
+        owners = []
+        probs = []
+        for k, board in enumerate(afterstates):
+            sample_cells, cell_weights = self._sample_cells(board)
+            if not sample_cells:
+                outcomes.append(board.reshape(1, 16))
+                owners.append(k)
+                probs.append(1.0)
+                continue
+
+            n = len(sample_cells)
+            spawned = np.repeat(board.reshape(1, 16), 2 * n, axis=0)
+            spawned[np.arange(n), sample_cells] = 1
+            spawned[np.arange(n, 2 * n), sample_cells] = 2
+            outcomes.append(spawned)
+            owners.extend([k] * (2 * n))
+            probs.extend([0.9 * w for w in cell_weights] + [0.1 * w for w in cell_weights])
+
+        scores = self.evaluate_many(np.concatenate(outcomes).reshape(-1, 4, 4))
+        return np.bincount(owners, weights=scores * probs, minlength=len(afterstates))
+
+    def choose_move(self, board, time_budget=None, node_budget=None):
         """
-        Zapisuje stan AI (wagi obu mózgów) do pliku pickle.
+        Wybiera ruch dla planszy silnikiem wskazanym przez `search_backend`.
+
+        Dla 'expectimax' przeszukiwanie jest pogłębiane, dopóki starcza budżetu,
+        i zawsze zwraca najlepszy ruch ostatniej pełnej iteracji (głębokość 1
+        jest liczona zawsze). Silnik 'sampled' wykonuje jedno tanie przejście
+        i ignoruje budżety.
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+            time_budget (float, optional): Czas na decyzję w sekundach.
+            node_budget (int, optional): Limit odwiedzonych węzłów przeszukiwania.
+
+        Returns:
+            str | None: Najlepszy kierunek lub None, gdy brak legalnych ruchów.
+
+        Raises:
+            ValueError: Dla nieznanego `search_backend`.
+        """
+        if self.search_backend == 'expectimax':
+            config = (self.search_depth, self.search_workers)
+            if self._searcher is None or self._searcher_config != config:
+                self.close_search()
+                if self.search_workers > 1:
+                    self._searcher = ParallelExpectimaxSearch(self, self.search_workers,
+                                                              max_depth=self.search_depth)
+                else:
+                    self._searcher = ExpectimaxSearch(self, max_depth=self.search_depth)
+                self._searcher_config = config
+            self._searcher.time_limit = time_budget
+            self._searcher.max_nodes = node_budget
+            move, self.last_search_stats = self._searcher.search(board)
+            return move
+
+        if self.search_backend != 'sampled':
+            raise ValueError("Błąd silnika przeszukiwania")
+
+        sim_game = self._simulation()
+        sim_game.load_state(board)
+        valid_moves = sim_game.get_valid_moves()
+        if not valid_moves:
+            self.last_search_stats = {'nodes': 0, 'depth': 0}
+            return None
+
+        afterstates = []
+        for move in valid_moves:
+            sim_game.push_move(move)
+            afterstates.append(sim_game.exponents.copy())
+            sim_game.pop_state()
+
+        values = self.get_expected_values(afterstates)
+        self.last_search_stats = {'nodes': len(afterstates), 'depth': 1}
+        return valid_moves[int(np.argmax(values))]
+
+    def close_search(self):
+        """Zwalnia silnik przeszukiwania (w tym pulę procesów `ParallelExpectimaxSearch`)."""
+        if isinstance(self._searcher, ParallelExpectimaxSearch):
+            self._searcher.close()
+        self._searcher = None
+
+    def checkpoint_arrays(self, episode_count, config=None):
+        """
+        Buduje migawkę stanu do checkpointu .npz (kopie tablic, bez pickle).
+
+        Zawiera wersję schematu, wagi obu mózgów, stan "optymalizatora"
+        (`alpha`), stan generatora próbkowania (razem z niewykorzystanymi
+        liczbami z bufora `UniformBuffer`), opcjonalnie sieć n-krotek
+        i konfigurację treningu.
 
         Args:
-            filename (str): Ścieżka do pliku.
             episode_count (int): Numer aktualnego epizodu treningu.
+            config (dict, optional): Konfiguracja treningu (serializowalna do JSON).
+
+        Returns:
+            dict: Tablice do `np.savez`.
         """
-        data = {
-            'weights_normal': self.weights_normal,
-            'weights_panic': self.weights_panic,
-            'episode': episode_count
+        generator_state, buffered = self.rng.get_state()
+        arrays = {
+            'schema_version': np.array(SCHEMA_VERSION),
+            'episode': np.array(episode_count),
+            'weights_normal': np.array(self.weights_normal, dtype=np.float64),
+            'weights_panic': np.array(self.weights_panic, dtype=np.float64),
+            'alpha': np.array(self.alpha),
+            'rng_state': encode_json(generator_state),
+            'rng_buffered': np.array(buffered, dtype=np.float64),
+            'config': encode_json(config or {}),
         }
-        with open(filename, 'wb') as f:
-            pickle.dump(data, f)
+        if self.ntuple is not None:
+            arrays['ntuple_tuples'] = encode_json(self.ntuple.tuples)
+            arrays['ntuple_weights'] = self.ntuple.weights.copy()
+            arrays['ntuple_alpha'] = np.array(self.ntuple.alpha)
+        return arrays
+
+    def save_model(self, filename, episode_count, config=None, writer=None, keep_last=3):
+        """
+        Zapisuje checkpoint .npz (patrz `checkpoint_arrays`) atomowo.
+
+        Args:
+            filename (str): Ścieżka do pliku .npz.
+            episode_count (int): Numer aktualnego epizodu treningu.
+            config (dict, optional): Konfiguracja treningu.
+            writer (CheckpointWriter, optional): Zapis w wątku tła; bez niego
+                zapis jest synchroniczny.
+            keep_last (int): Liczba kopii historycznych przy zapisie synchronicznym.
+        """
+        arrays = self.checkpoint_arrays(episode_count, config)
+        if writer is not None:
+            writer.save(filename, arrays)
+            return
+        write_checkpoint(filename, arrays, keep_last)
         print(f"--> Zapisano checkpoint (Epizod: {episode_count})")
 
     def load_model(self, filename):
         """
         Wczytuje stan AI z pliku. Obsługuje wsteczną kompatybilność.
 
+        Rozpoznaje checkpoint .npz (`save_model`) oraz dawny zapis pickle
+        (także z jednym zestawem wag).
+
         Args:
             filename (str): Ścieżka do pliku.
 
@@ -306,6 +1122,9 @@ class AIPlayer:
         if not os.path.exists(filename):
             return 0
         try:
+            if zipfile.is_zipfile(filename):
+                return self._load_checkpoint(filename)
+
             with open(filename, 'rb') as f:
                 data = pickle.load(f)
 
@@ -318,7 +1137,86 @@ class AIPlayer:
                     self.weights_panic = old_weights.copy()
                     print("Konwersja starego zapisu na Dual-Weights...")
 
+                if 'ntuple_weights' in data:
+                    self.ntuple = NTupleNetwork(data['ntuple_tuples'], data['ntuple_weights'])
+                    self._weights_changed()
+
                 return data['episode']
         except Exception as e:
             print(f"Błąd odczytu zapisu: {e}")
-            return 0
\ No newline at end of file
+            return 0
+
+    def _load_checkpoint(self, filename):
+        """
+        Wczytuje checkpoint .npz zapisany przez `save_model`.
+
+        Args:
+            filename (str): Ścieżka do pliku.
+
+        Returns:
+            int: Numer zapisanego epizodu.
+        """
+        data = read_checkpoint(filename)
+        self.weights_normal = data['weights_normal']
+        self.weights_panic = data['weights_panic']
+        self.alpha = float(data['alpha'])
+
+        self.rng = UniformBuffer()
+        self.rng.set_state(decode_json(data['rng_state']), data.get('rng_buffered', np.empty(0)).tolist())
+
+        if 'ntuple_weights' in data:
+            self.ntuple = NTupleNetwork(decode_json(data['ntuple_tuples']), data['ntuple_weights'],
+                                        float(data['ntuple_alpha']))
+            self._weights_changed()
+
+        self.checkpoint_config = decode_json(data['config'])
+        return int(data['episode'])
+
+
+def check_evaluators(n_boards=1000, seed=0):
+    """
+    Porównuje szybkie ścieżki oceny ze ścieżką referencyjną na losowych planszach.
+
+    Dla losowych wag sprawdzane są: `evaluate` ('fused') względem
+    `_evaluate_reference` (wynik identyczny), cechy `_fused_terms` względem
+    `get_features` (identyczne), a także `evaluate_many` i ewaluator 'lut'
+    (zgodne z dokładnością do 1e-9, inna kolejność sumowania). Na czas
+    sprawdzenia wybierany jest backend jąder 'numpy', czyli pierwotny kod.
+
+    Args:
+        n_boards (int): Liczba losowych plansz.
+        seed (int): Ziarno generatora plansz i wag.
+
+    Returns:
+        bool: True jeśli wszystkie wyniki są zgodne.
+    """
+    previous = kernels.BACKEND
+    kernels.set_backend('numpy')
+    try:
+        rng = np.random.default_rng(seed)
+        ai = AIPlayer()
+        ai.weights_normal = rng.random(6) * 3
+        ai.weights_panic = rng.random(6) * 3
+
+        boards = rng.integers(0, 14, size=(n_boards, 4, 4)).astype(np.uint8)
+        boards[rng.random((n_boards, 4, 4)) < rng.random((n_boards, 1, 1))] = 0
+        boards[0] = 0
+
+        reference = np.array([ai._evaluate_reference(board) for board in boards])
+        fused = np.array([ai.evaluate(board) for board in boards])
+        ai.evaluator = 'lut'
+        lut = np.array([ai.evaluate(board) for board in boards])
+        ai.evaluator = 'fused'
+        batched = ai.evaluate_many(boards)
+
+        mismatches = (fused != reference) | \
+                     (np.abs(batched - reference) > 1e-9) | \
+                     (np.abs(lut - reference) > 1e-9)
+        for i, board in enumerate(boards):
+            if not np.array_equal(ai._fused_terms(board)[0], ai.get_features(board)):
+                mismatches[i] = True
+    finally:
+        kernels.set_backend(previous)
+
+    print(f"--> Ewaluatory vs ścieżka referencyjna: {n_boards - mismatches.sum()}/{n_boards} plansz zgodnych")
+    return not mismatches.any()
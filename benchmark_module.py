@@ -7,6 +7,8 @@ import time
 from collections import Counter
 from game_2048 import Game2048
 from ai_player import AIPlayer
+from expectimax import ExpectimaxSearch
+from game_bitboard import UniformBuffer, BitboardGame2048, exponents_to_bitboard, move_bitboard
 import concurrent.futures
 
 try:
@@ -23,32 +25,63 @@ CELL_COLORS = {
 }
 TEXT_COLORS = { 2: '#776e65', 4: '#776e65', 'other': '#f9f6f2'}
 
-def run_single_game(weights_normal, weights_panic, log_table):
+_worker_ntuple = None
+
+# Ustawienia przeszukiwania kopiowane z ocenianego modelu do AI w procesach gier.
+# `search_workers` celowo pominięte: gry już działają w puli procesów.
+SEARCH_SETTINGS = ('search_backend', 'search_depth', 'sample_count', 'sample_scheme', 'evaluator')
+
+
+def _init_worker(ntuple):
+    """
+    Inicjalizuje proces roboczy benchmarku: sieć n-krotek trafia do procesu raz,
+    a nie z każdą grą (tablice wag zajmują ponad 100 MB).
+    """
+    global _worker_ntuple
+    _worker_ntuple = ntuple
+
+
+def run_single_game(weights_normal, weights_panic, log_table, seed=None, search_settings=None):
     """
     Uruchamia pojedynczą grę w izolowanym procesie.
     
     Zbiera heatmapę (częstotliwość odwiedzin pól) dla każdego ruchu.
+    Sieć n-krotek (jeśli oceniany model jej używa) pochodzi z `_init_worker`.
 
     Args:
         weights_normal (np.ndarray): Wagi dla trybu normalnego.
         weights_panic (np.ndarray): Wagi dla trybu paniki.
         log_table (np.ndarray): Tablica prekomputowanych logarytmów (nieużywana w tej wersji, ale zachowana).
+        seed (np.random.SeedSequence, optional): Ziarno gry; dzielone na niezależne
+            strumienie dla losowania kafelków i dla próbkowania AI.
+        search_settings (dict, optional): Atrybuty przeszukiwania AI (`SEARCH_SETTINGS`)
+            oraz budżety ruchu 'time_budget'/'node_budget' dla `choose_move`;
+            bez nich używane są domyślne z `AIPlayer`.
 
     Returns:
         tuple: (wynik, max_kafelek, plansza_końcowa, lokalna_heatmapa, liczba_ruchów)
     """
-    ai = AIPlayer()
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    game_seed, ai_seed = seed.spawn(2)
+
+    ai = AIPlayer(seed=ai_seed)
     ai.weights_normal = weights_normal
     ai.weights_panic = weights_panic
+    ai.ntuple = _worker_ntuple
     ai.log_table = log_table
     ai.epsilon = 0
     ai.alpha = 0
+    settings = dict(search_settings or {})
+    time_budget = settings.pop('time_budget', None)
+    node_budget = settings.pop('node_budget', None)
+    for name, value in settings.items():
+        setattr(ai, name, value)
 
-    game = Game2048()
-    sim_game = Game2048()
+    game = Game2048(seed=game_seed)
 
     done = False
-    state = game.board.copy()
+    state = game.exponents.copy()
 
     local_heatmap = np.zeros((4, 4), dtype=float)
     moves_in_game = 0
@@ -58,14 +91,7 @@ def run_single_game(weights_normal, weights_panic, log_table):
         if not valid_moves:
             break
 
-        best_move, best_v = None, -float('inf')
-        for move in valid_moves:
-            sim_game.board = state
-            next_s, _, _ = sim_game.move_without_random(move)
-            v = ai.get_expected_value(next_s)
-            if v > best_v:
-                best_v = v
-                best_move = move
+        best_move = ai.choose_move(state, time_budget=time_budget, node_budget=node_budget)
 
         state, _, done, _ = game.move(best_move)
 
@@ -74,6 +100,197 @@ def run_single_game(weights_normal, weights_panic, log_table):
 
     return game.score, np.max(game.board), game.board, local_heatmap, moves_in_game
 
+def build_board_corpus(ai, n_boards=30, every=15, seed=0):
+    """
+    Buduje stały zbiór plansz testowych z gier rozegranych przez AI.
+
+    Args:
+        ai (AIPlayer): Gracz wybierający ruchy (`choose_move`).
+        n_boards (int): Liczba plansz.
+        every (int): Co ile ruchów zapisywać planszę.
+        seed (int): Ziarno gier (ten sam seed = ten sam zbiór).
+
+    Returns:
+        list[np.ndarray]: Plansze (wykładniki).
+    """
+    boards = []
+    game_seeds = np.random.SeedSequence(seed).spawn(n_boards)
+    for game_seed in game_seeds:
+        game = Game2048(seed=game_seed)
+        moves = 0
+        while len(boards) < n_boards:
+            move = ai.choose_move(game.exponents)
+            if move is None:
+                break
+            if moves % every == 0:
+                boards.append(game.exponents.copy())
+            game.move(move)
+            moves += 1
+        if len(boards) >= n_boards:
+            break
+    return boards
+
+
+def search_pruning_report(ai, depth=2, boards=None):
+    """
+    Porównuje Expectimax z przycinaniem Star1 i porządkowaniem ruchów z wersją bez nich.
+
+    Na stałym zbiorze plansz wypisuje liczbę węzłów, czas i zgodność decyzji
+    każdego wariantu z przeszukiwaniem bez przycinania (bez cache i limitu czasu).
+
+    Args:
+        ai (AIPlayer): Gracz z wagami heurystyki.
+        depth (int): Głębokość przeszukiwania.
+        boards (list, optional): Plansze testowe (domyślnie `build_board_corpus(ai)`).
+
+    Returns:
+        dict: Dla każdego wariantu (węzły, czas_s, zgodne_decyzje).
+    """
+    if boards is None:
+        boards = build_board_corpus(ai)
+
+    variants = [
+        ('bez przycinania', False, False),
+        ('porządkowanie', False, True),
+        ('Star1', True, False),
+        ('Star1 + porządkowanie', True, True),
+    ]
+    report = {}
+    reference = None
+    print(f"--> Przycinanie Expectimax: {len(boards)} plansz, głębokość {depth}")
+    for name, pruning, move_ordering in variants:
+        search = ExpectimaxSearch(ai, max_depth=depth, time_limit=None, cache_mb=0,
+                                  pruning=pruning, move_ordering=move_ordering)
+        start = time.time()
+        moves, nodes = [], 0
+        for board in boards:
+            move, stats = search.search(board)
+            moves.append(move)
+            nodes += stats['nodes']
+        duration = time.time() - start
+        if reference is None:
+            reference = moves
+        agree = sum(m == r for m, r in zip(moves, reference))
+        report[name] = (nodes, duration, agree)
+        print(f"    {name:<22} węzły: {nodes:>9}  czas: {duration:6.2f}s  zgodność: {agree}/{len(boards)}")
+    return report
+
+
+def sampling_variance_report(ai, sample_counts=(1, 2, 3, 4, 6), schemes=('uniform', 'stratified'),
+                             boards=None, repeats=20, seed=0):
+    """
+    Pokazuje, jak niestabilność decyzji silnika 'sampled' zależy od liczby próbek.
+
+    Dla każdej planszy z korpusu decyzja jest podejmowana `repeats` razy
+    (różne strumienie losowe). Raportowane są: niestabilność (odsetek decyzji
+    innych niż najczęstsza dla danej planszy) oraz niezgodność z decyzją
+    przy uśrednieniu po wszystkich pustych polach ('all').
+
+    Args:
+        ai (AIPlayer): Gracz z wagami heurystyki (jego ustawienia próbkowania są przywracane).
+        sample_counts (tuple): Badane liczby próbek.
+        schemes (tuple): Badane schematy próbkowania.
+        boards (list, optional): Plansze testowe (domyślnie `build_board_corpus(ai)`).
+        repeats (int): Liczba powtórzeń decyzji na planszę.
+        seed (int): Ziarno strumieni losowych.
+
+    Returns:
+        dict: {(schemat, liczba_próbek): (niestabilność, niezgodność_z_all)}
+    """
+    saved = (ai.rng, ai.sample_scheme, ai.sample_count, ai.search_backend)
+    ai.search_backend = 'sampled'
+    try:
+        if boards is None:
+            boards = build_board_corpus(ai)
+
+        ai.sample_scheme = 'all'
+        reference = [ai.choose_move(board) for board in boards]
+
+        seeds = np.random.SeedSequence(seed).spawn(repeats)
+        report = {}
+        print(f"--> Wariancja decyzji: {len(boards)} plansz x {repeats} powtórzeń")
+        for scheme in schemes:
+            for count in sample_counts:
+                ai.sample_scheme = scheme
+                ai.sample_count = count
+                unstable = wrong = 0
+                for board, ref_move in zip(boards, reference):
+                    moves = []
+                    for repeat_seed in seeds:
+                        ai.rng = UniformBuffer(repeat_seed)
+                        moves.append(ai.choose_move(board))
+                    unstable += repeats - Counter(moves).most_common(1)[0][1]
+                    wrong += sum(m != ref_move for m in moves)
+                total = len(boards) * repeats
+                report[(scheme, count)] = (unstable / total, wrong / total)
+                print(f"    {scheme:<10} próbki: {count:>2}  niestabilność: {unstable / total:6.1%}"
+                      f"  niezgodność z 'all': {wrong / total:6.1%}")
+    finally:
+        ai.rng, ai.sample_scheme, ai.sample_count, ai.search_backend = saved
+    return report
+
+
+def move_throughput_report(n_boards=200, steps=20000, seed=0):
+    """
+    Mierzy przepustowość ruchów `Game2048` i `BitboardGame2048`.
+
+    Raportowane są dwa pomiary: samo jądro ruchu (`_calculate_move_result`
+    wobec `move_bitboard` na tych samych losowych planszach, 4 kierunki)
+    oraz pełna pętla gry losowymi ruchami (`get_valid_moves` + `move`
+    z dolosowaniem kafelka), w której zysk jest mniejszy przez stały narzut
+    obu silników.
+
+    Args:
+        n_boards (int): Liczba losowych plansz dla pomiaru jądra.
+        steps (int): Liczba ruchów w pętli gry.
+        seed (int): Ziarno plansz i ruchów.
+
+    Returns:
+        dict: {'kernel': (ruchy/s Game2048, ruchy/s bitboard),
+               'game': (ruchy/s Game2048, ruchy/s bitboard)}
+    """
+    rng = np.random.default_rng(seed)
+    boards = rng.integers(0, 12, size=(n_boards, 4, 4)).astype(np.uint8)
+    packed = [exponents_to_bitboard(board) for board in boards]
+    directions = ['left', 'right', 'up', 'down']
+
+    game = Game2048()
+    start = time.perf_counter()
+    for board in boards:
+        game.exponents = board
+        for direction in directions:
+            game._calculate_move_result(direction)
+    base_kernel = 4 * n_boards / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for bb in packed:
+        for direction in directions:
+            move_bitboard(bb, direction)
+    bit_kernel = 4 * n_boards / (time.perf_counter() - start)
+
+    def random_game_rate(game_class):
+        game = game_class(seed=seed)
+        move_rng = np.random.default_rng(seed)
+        moves = 0
+        start = time.perf_counter()
+        while moves < steps:
+            valid_moves = game.get_valid_moves()
+            if not valid_moves:
+                game.reset()
+                continue
+            game.move(valid_moves[move_rng.integers(len(valid_moves))])
+            moves += 1
+        return steps / (time.perf_counter() - start)
+
+    report = {'kernel': (base_kernel, bit_kernel),
+              'game': (random_game_rate(Game2048), random_game_rate(BitboardGame2048))}
+    print("--> Przepustowość ruchów (ruchy/s)")
+    for name, label in (('kernel', 'jądro ruchu'), ('game', 'pętla gry')):
+        base, bit = report[name]
+        print(f"    {label:<12} Game2048: {base:>9.0f}  bitboard: {bit:>9.0f}  zysk: x{bit / base:.1f}")
+    return report
+
+
 class Benchmark:
     """
     Moduł testujący wydajność AI na dużej próbie gier.
@@ -87,10 +304,18 @@ class Benchmark:
         ai (AIPlayer): Instancja agenta AI do przetestowania.
         games_to_run (int): Liczba gier do symulacji (domyślnie 1000).
         output_folder (str): Folder na wyniki.
+        seed (int, optional): Ziarno benchmarku (None = losowe, wypisywane na konsolę).
+        time_budget (float, optional): Czas na ruch w sekundach dla silnika 'expectimax'.
+        node_budget (int, optional): Limit węzłów na ruch dla silnika 'expectimax'.
+            Bez żadnego budżetu benchmark gra silnikiem 'sampled' - pełne
+            przeszukiwanie każdego ruchu trwałoby godziny.
     """
     def __init__(self, ai_player):
         self.ai = ai_player
         self.games_to_run = 1000
+        self.seed = None
+        self.time_budget = None
+        self.node_budget = None
         self.output_prefix = "avg1k"
         self.output_folder = "benchmarks"
 
@@ -140,8 +365,20 @@ class Benchmark:
             for i in range(1, 17):
                 l_table[2**i] = float(i)
 
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            futures = [executor.submit(run_single_game, w_norm, w_panic, l_table) for _ in range(self.games_to_run)]
+        seed_seq = np.random.SeedSequence(self.seed)
+        print(f"--> Ziarno benchmarku: {seed_seq.entropy}")
+        game_seeds = seed_seq.spawn(self.games_to_run)
+        search_settings = {name: getattr(self.ai, name) for name in SEARCH_SETTINGS}
+        search_settings.update(time_budget=self.time_budget, node_budget=self.node_budget)
+        if search_settings['search_backend'] == 'expectimax' and \
+                self.time_budget is None and self.node_budget is None:
+            print("--> Brak budżetu ruchu dla 'expectimax', benchmark używa silnika 'sampled'")
+            search_settings['search_backend'] = 'sampled'
+
+        with concurrent.futures.ProcessPoolExecutor(initializer=_init_worker,
+                                                    initargs=(self.ai.ntuple,)) as executor:
+            futures = [executor.submit(run_single_game, w_norm, w_panic, l_table, game_seed,
+                                       search_settings) for game_seed in game_seeds]
 
             for i, future in enumerate(concurrent.futures.as_completed(futures)):
                 score, max_val, final_board, local_heatmap, moves_cnt = future.result()
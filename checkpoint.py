@@ -0,0 +1,129 @@
+"""
+Moduł z binarnym zapisem checkpointów (np.savez): zapis atomowy, w tle, z historią.
+"""
+import os
+import glob
+import json
+import shutil
+import threading
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+
+def _history_paths(path):
+    """Zwraca ścieżki historii checkpointu `path` posortowane od najstarszej."""
+    stem, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{glob.escape(stem)}.ep*{ext}"))
+
+
+def write_checkpoint(path, arrays, keep_last=3):
+    """
+    Zapisuje checkpoint atomowo i utrzymuje historię ostatnich `keep_last` zapisów.
+
+    Dane trafiają najpierw do pliku tymczasowego (z `fsync`), który jest
+    następnie podmieniany atomowo (`os.replace`) - przerwanie zapisu nigdy nie
+    psuje poprzedniego pliku. Kopia historyczna `<nazwa>.ep<epizod><rozszerzenie>`
+    jest dowiązaniem twardym (albo kopią, gdy system plików ich nie obsługuje).
+
+    Args:
+        path (str): Docelowa ścieżka pliku .npz.
+        arrays (dict): Tablice do zapisu (w tym 'episode').
+        keep_last (int): Liczba zachowywanych kopii historycznych (0 = bez historii).
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    if keep_last <= 0:
+        return
+    stem, ext = os.path.splitext(path)
+    history_path = f"{stem}.ep{int(arrays['episode']):07d}{ext}"
+    if os.path.exists(history_path):
+        os.remove(history_path)
+    try:
+        os.link(path, history_path)
+    except OSError:
+        shutil.copyfile(path, history_path)
+    for old_path in _history_paths(path)[:-keep_last]:
+        os.remove(old_path)
+
+
+def read_checkpoint(path):
+    """
+    Wczytuje checkpoint .npz.
+
+    Args:
+        path (str): Ścieżka pliku.
+
+    Returns:
+        dict: Tablice checkpointu.
+
+    Raises:
+        ValueError: Jeśli plik ma nowszą (nieznaną) wersję schematu.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    if int(arrays['schema_version']) > SCHEMA_VERSION:
+        raise ValueError("Błąd wersji schematu checkpointu")
+    return arrays
+
+
+def encode_json(value):
+    """Zapisuje obiekt JSON jako tablicę napisu (do np.savez bez pickle)."""
+    return np.array(json.dumps(value))
+
+
+def decode_json(array):
+    """Odczytuje obiekt zapisany przez `encode_json`."""
+    return json.loads(str(array))
+
+
+class CheckpointWriter:
+    """
+    Zapisuje checkpointy w wątku tła, żeby nie zatrzymywać pętli treningowej.
+
+    Naraz trwa co najwyżej jeden zapis: kolejny `save` czeka na poprzedni.
+    Tablice muszą być migawką (kopiami) stanu z chwili wywołania.
+
+    Attributes:
+        keep_last (int): Liczba zachowywanych kopii historycznych.
+        last_error (Exception | None): Błąd ostatniego nieudanego zapisu.
+
+    Args:
+        keep_last (int): Patrz atrybut `keep_last`.
+    """
+    def __init__(self, keep_last=3):
+        self.keep_last = keep_last
+        self.last_error = None
+        self._thread = None
+
+    def save(self, path, arrays):
+        """
+        Zleca zapis checkpointu w tle.
+
+        Args:
+            path (str): Docelowa ścieżka pliku .npz.
+            arrays (dict): Migawka tablic do zapisu.
+        """
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(path, arrays))
+        self._thread.start()
+
+    def wait(self):
+        """Czeka na zakończenie trwającego zapisu."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _write(self, path, arrays):
+        """Treść wątku zapisu."""
+        try:
+            write_checkpoint(path, arrays, self.keep_last)
+            print(f"--> Zapisano checkpoint (Epizod: {int(arrays['episode'])})")
+        except Exception as e:
+            self.last_error = e
+            print(f"Błąd zapisu checkpointu: {e}")
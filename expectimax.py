@@ -0,0 +1,320 @@
+"""
+Moduł z przeszukiwaniem Expectimax o zadanej głębokości (iteracyjne pogłębianie z limitem czasu).
+"""
+import time
+import numpy as np
+from game_2048 import Game2048
+from game_bitboard import DIRECTIONS, exponents_to_bitboard, legal_moves_mask, move_bitboard
+from transposition_table import TranspositionTable
+
+
+class SearchTimeout(Exception):
+    """Przekroczono czas lub limit węzłów przeznaczony na ruch (przerywa bieżącą iterację)."""
+
+
+class ExpectimaxSearch:
+    """
+    Przeszukiwanie Expectimax: na zmianę warstwy gracza (max) i losowania kafelka (chance).
+
+    Węzeł losowy rozpatruje każde puste pole z kafelkiem 2 (p=0.9) i 4 (p=0.1).
+    Gałęzie, których skumulowane prawdopodobieństwo spadnie poniżej
+    `min_probability`, są oceniane heurystyką zamiast dalszego rozwijania.
+    Iteracyjne pogłębianie zwiększa głębokość do `max_depth`, dopóki nie minie
+    limit czasu lub węzłów; przerwana iteracja jest odrzucana (zwracany jest
+    wynik ostatniej pełnej).
+
+    Przy `pruning=True` węzły losowe są przycinane metodą Star1: znając
+    przedział wartości oceny (`AIPlayer.value_bounds`), pomija się resztę
+    wyników losowania, gdy nawet skrajne wartości pozostałej masy
+    prawdopodobieństwa nie zmienią decyzji w węźle gracza. Wynik przycinania
+    jest dokładny (ta sama decyzja co bez przycinania); ruchy w węźle gracza
+    mogą być porządkowane tanią oceną (`move_ordering`), żeby dobry ruch zawężał
+    okno jak najwcześniej (domyślnie wyłączone: przy luźnych ograniczeniach
+    oceny nie zmniejsza liczby węzłów, patrz `benchmark_module.search_pruning_report`).
+
+    Liście są oceniane przez `AIPlayer.evaluate_many` (wszystkie wyniki losowania naraz),
+    a ruchy wykonywane na `Game2048` przez `push_move`/`push_tile`/`pop_state`.
+
+    Attributes:
+        ai (AIPlayer): Gracz dostarczający funkcję oceny.
+        max_depth (int): Maksymalna liczba ruchów gracza w głąb.
+        time_limit (float | None): Czas na ruch w sekundach (None = bez limitu).
+        max_nodes (int | None): Limit odwiedzonych węzłów na ruch (None = bez limitu).
+        min_probability (float): Próg skumulowanego prawdopodobieństwa gałęzi.
+        pruning (bool): Czy stosować przycinanie Star1.
+        move_ordering (bool): Czy porządkować ruchy w węzłach gracza.
+        tt (TranspositionTable | None): Cache wartości węzłów losowych (klucz: plansza i głębokość).
+
+    Args:
+        ai (AIPlayer): Gracz z wagami heurystyki.
+        max_depth (int): Patrz atrybut `max_depth`.
+        time_limit (float | None): Patrz atrybut `time_limit`.
+        min_probability (float): Patrz atrybut `min_probability`.
+        max_nodes (int | None): Patrz atrybut `max_nodes`.
+        cache_mb (float): Limit pamięci cache węzłów losowych (0 wyłącza).
+        pruning (bool): Patrz atrybut `pruning`.
+        move_ordering (bool): Patrz atrybut `move_ordering`.
+    """
+    def __init__(self, ai, max_depth=3, time_limit=0.1, min_probability=1e-4, max_nodes=None,
+                 cache_mb=32, pruning=True, move_ordering=False):
+        self.ai = ai
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.min_probability = min_probability
+        self.pruning = pruning
+        self.move_ordering = move_ordering
+        self.tt = TranspositionTable(cache_mb) if cache_mb else None
+        self._weights_version = None
+        self._low, self._high = -float('inf'), float('inf')
+        self.sim = Game2048(max_depth=4 * max_depth + 2)
+        self._deadline = None
+        self._node_limit = None
+        self.nodes = 0
+
+    def _sync_weights(self):
+        """Po zmianie wag gracza czyści cache i przelicza przedział wartości oceny."""
+        if self._weights_version == self.ai.weights_version:
+            return
+        if self.tt is not None:
+            self.tt.clear()
+        self._low, self._high = self.ai.value_bounds()
+        self._weights_version = self.ai.weights_version
+
+    def search(self, board):
+        """
+        Wybiera ruch dla planszy, pogłębiając przeszukiwanie do limitu głębokości lub czasu.
+
+        Pierwsza iteracja (głębokość 1) zawsze kończy się, niezależnie od limitów.
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+
+        Returns:
+            tuple: (ruch, statystyki) - ruch to kierunek lub None, gdy brak legalnych ruchów;
+                statystyki to dict z kluczami 'nodes', 'depth', 'time', 'value'.
+        """
+        start = time.perf_counter()
+        self._sync_weights()
+
+        self.nodes = 0
+        self.sim.load_state(board)
+        valid_moves = self._ordered_moves()
+
+        best_move, best_value, reached = None, None, 0
+        if valid_moves:
+            for depth in range(1, self.max_depth + 1):
+                if depth > 1 and self.time_limit is not None:
+                    self._deadline = start + self.time_limit
+                if depth > 1:
+                    self._node_limit = self.max_nodes
+                try:
+                    move, value = self._root(valid_moves, depth)
+                except SearchTimeout:
+                    self.sim.load_state(board)
+                    break
+                finally:
+                    self._deadline = None
+                    self._node_limit = None
+                best_move, best_value, reached = move, value, depth
+                if self.time_limit is not None and time.perf_counter() - start >= self.time_limit:
+                    break
+                if self.max_nodes is not None and self.nodes >= self.max_nodes:
+                    break
+
+        stats = {
+            'nodes': self.nodes,
+            'depth': reached,
+            'time': time.perf_counter() - start,
+            'value': best_value,
+        }
+        return best_move, stats
+
+    def afterstate_value(self, board, depth, time_limit=None, max_nodes=None):
+        """
+        Wartość jednej planszy po ruchu gracza (poddrzewo korzenia) na zadaną głębokość.
+
+        Używane przez procesy robocze `ParallelExpectimaxSearch`; licznik `nodes`
+        dotyczy tylko tego wywołania. Liczona jest wartość dokładna (bez okna Star1).
+
+        Args:
+            board (np.ndarray): Plansza po ruchu gracza (wykładniki), przed losowaniem kafelka.
+            depth (int): Liczba ruchów gracza, wliczając ruch już wykonany.
+            time_limit (float, optional): Czas na obliczenie w sekundach.
+            max_nodes (int, optional): Limit odwiedzonych węzłów.
+
+        Returns:
+            float | None: Wartość oczekiwana lub None, gdy przekroczono limit.
+        """
+        self._sync_weights()
+
+        self.nodes = 0
+        self.sim.load_state(board)
+        if time_limit is not None:
+            self._deadline = time.perf_counter() + time_limit
+        self._node_limit = max_nodes
+        try:
+            return self._chance_value(depth, 1.0, self._low, self._high)
+        except SearchTimeout:
+            return None
+        finally:
+            self._deadline = None
+            self._node_limit = None
+
+    def _ordered_moves(self):
+        """
+        Zwraca legalne ruchy planszy symulacji, najlepsze (wg taniej oceny) najpierw.
+
+        Tania ocena to punkty za połączenia w ruchu (z tablic wierszy bitboardu);
+        pełna ocena `evaluate_bitboard` kosztowała więcej, niż oszczędzała.
+
+        Returns:
+            list[str]: Kierunki ruchów.
+        """
+        if not self.move_ordering:
+            return self.sim.get_valid_moves()
+
+        bb = exponents_to_bitboard(self.sim.exponents)
+        mask = legal_moves_mask(bb)
+        scored = []
+        for i, direction in enumerate(DIRECTIONS):
+            if mask >> i & 1:
+                scored.append((-move_bitboard(bb, direction)[1], i))
+        scored.sort()
+        return [DIRECTIONS[i] for _, i in scored]
+
+    def _root(self, valid_moves, depth):
+        """
+        Ocenia wszystkie legalne ruchy korzenia na zadaną głębokość.
+
+        Returns:
+            tuple: (najlepszy_ruch, jego_wartość)
+        """
+        best_move, best_value = None, -float('inf')
+        for move in valid_moves:
+            self.sim.push_move(move)
+            value = self._chance_value(depth, 1.0, max(best_value, self._low), self._high)
+            self.sim.pop_state()
+            if value > best_value:
+                best_value = value
+                best_move = move
+        return best_move, best_value
+
+    def _max_value(self, depth, probability, alpha, beta):
+        """
+        Wartość węzła gracza: najlepszy ruch (lub ocena planszy, gdy gra skończona).
+
+        Wynik jest dokładny, jeśli leży ściśle w oknie (alpha, beta); w przeciwnym razie
+        jest tylko ograniczeniem (przycięcie Star1).
+
+        Args:
+            depth (int): Liczba ruchów gracza, które zostały do rozwinięcia.
+            probability (float): Skumulowane prawdopodobieństwo dojścia do węzła.
+            alpha (float): Dolna granica okna.
+            beta (float): Górna granica okna.
+
+        Returns:
+            float: Wartość węzła.
+        """
+        self.nodes += 1
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        if self._node_limit is not None and self.nodes > self._node_limit:
+            raise SearchTimeout()
+
+        valid_moves = self._ordered_moves()
+        if not valid_moves:
+            return self.ai.evaluate(self.sim.exponents)
+
+        best_value = -float('inf')
+        for move in valid_moves:
+            self.sim.push_move(move)
+            value = self._chance_value(depth, probability, max(alpha, best_value), beta)
+            self.sim.pop_state()
+            if value > best_value:
+                best_value = value
+                if self.pruning and best_value >= beta:
+                    break
+        return best_value
+
+    def _chance_value(self, depth, probability, alpha, beta):
+        """
+        Wartość węzła losowego: średnia ważona po wszystkich pustych polach i kafelkach 2/4.
+
+        Przy włączonym `pruning` (Star1) po każdym wyniku losowania sprawdzane jest,
+        czy reszta masy prawdopodobieństwa (wartości z przedziału oceny) może jeszcze
+        wyprowadzić średnią poza okno (alpha, beta); jeśli nie - zwracane jest ograniczenie.
+
+        Args:
+            depth (int): Liczba ruchów gracza do rozwinięcia, wliczając ruch właśnie wykonany.
+            probability (float): Skumulowane prawdopodobieństwo dojścia do węzła.
+            alpha (float): Dolna granica okna.
+            beta (float): Górna granica okna.
+
+        Returns:
+            float: Wartość oczekiwana węzła (lub ograniczenie po przycięciu).
+        """
+        self.nodes += 1
+        board = self.sim.exponents
+        if probability < self.min_probability:
+            return self.ai.evaluate(board)
+
+        key = None
+        if self.tt is not None:
+            key = self.tt.key(exponents_to_bitboard(board), depth)
+            value = self.tt.get(key)
+            if value is not None:
+                return value
+
+        empty_cells = np.flatnonzero(board.ravel() == 0)
+        n = len(empty_cells)
+        if depth == 1:
+            spawned = np.repeat(board.reshape(1, 16), 2 * n, axis=0)
+            spawned[np.arange(n), empty_cells] = 1
+            spawned[np.arange(n, 2 * n), empty_cells] = 2
+            scores = self.ai.evaluate_many(spawned.reshape(-1, 4, 4))
+            self.nodes += 2 * n
+            value = (0.9 * scores[:n].sum() + 0.1 * scores[n:].sum()) / n
+        else:
+            value = self._expand_chance(empty_cells, depth, probability, alpha, beta)
+
+        if key is not None and alpha < value < beta:
+            self.tt.put(key, value)
+        return value
+
+    def _expand_chance(self, empty_cells, depth, probability, alpha, beta):
+        """
+        Rozwija wyniki losowania węzła losowego (z przycinaniem Star1).
+
+        Wyniki z kafelkiem 2 (p=0.9) są rozwijane przed kafelkami 4, bo mają
+        większą wagę i szybciej zawężają okno.
+
+        Returns:
+            float: Wartość oczekiwana węzła lub ograniczenie po przycięciu.
+        """
+        n = len(empty_cells)
+        low, high = self._low, self._high
+        total = 0.0
+        remaining = 1.0
+        for exponent, p in ((1, 0.9), (2, 0.1)):
+            p_cell = p / n
+            for cell in empty_cells.tolist():
+                y, x = divmod(cell, 4)
+                remaining -= p_cell
+                if self.pruning:
+                    child_alpha = max((alpha - total - remaining * high) / p_cell, low)
+                    child_beta = min((beta - total - remaining * low) / p_cell, high)
+                else:
+                    child_alpha, child_beta = low, high
+
+                self.sim.push_tile(y, x, exponent)
+                value = self._max_value(depth - 1, probability * p_cell, child_alpha, child_beta)
+                self.sim.pop_state()
+                total += p_cell * value
+
+                if self.pruning:
+                    if value <= child_alpha and total + remaining * high <= alpha:
+                        return total + remaining * high
+                    if value >= child_beta and total + remaining * low >= beta:
+                        return total + remaining * low
+        return total
@@ -1,5 +1,37 @@
-import random
 import numpy as np
+import kernels
+from game_bitboard import (DIRECTIONS, ROW_LEFT_TABLE, ROW_SCORE_TABLE, ROW_CHANGED_TABLE,
+                           UniformBuffer, bitboard_into, exponents_to_bitboard, legal_moves_mask,
+                           move_bitboard, nth_set_bit)
+
+
+def exponents_to_values(exponents):
+    """
+    Zamienia planszę wykładników na wartości kafelków (do wyświetlania i wyników).
+
+    Args:
+        exponents (np.ndarray): Plansza wykładników (0 = puste pole).
+
+    Returns:
+        np.ndarray: Plansza wartości 0, 2, 4, 8... (dtype=int).
+    """
+    exponents = exponents.astype(int)
+    return np.where(exponents > 0, 1 << exponents, 0)
+
+
+def values_to_exponents(board):
+    """
+    Zamienia planszę wartości kafelków na wykładniki (uint8, 0 = puste pole).
+
+    Args:
+        board (np.ndarray): Plansza wartości 0, 2, 4, 8...
+
+    Returns:
+        np.ndarray: Plansza wykładników (dtype=uint8).
+    """
+    exponents = np.frexp(np.asarray(board, dtype=float))[1] - 1
+    return np.where(np.asarray(board) > 0, exponents, 0).astype(np.uint8)
+
 
 class Game2048:
     """
@@ -8,15 +40,90 @@ class Game2048:
     Zarządza stanem planszy, wykonuje ruchy, dodaje losowe kafelki
     i sprawdza warunki końca gry.
 
+    Plansza jest przechowywana natywnie jako wykładniki potęgi dwójki
+    (`uint8`, 0 = puste pole). Wartości kafelków są liczone tylko na
+    potrzeby wyświetlania (`board`) i punktacji.
+
     Attributes:
         size (int): Rozmiar planszy (domyślnie 4x4).
-        board (np.ndarray): Macierz NxN reprezentująca planszę gry.
+        exponents (np.ndarray): Macierz NxN wykładników (uint8) - natywny stan gry.
+        board (np.ndarray): Macierz NxN wartości kafelków (liczona przy odczycie).
         score (int): Aktualny wynik punktowy gry.
+        legal_mask (int): 4-bitowa maska legalnych ruchów (bit i = `DIRECTIONS[i]`).
+        spawn_rng (UniformBuffer): Własny strumień losowy gry.
+
+    Args:
+        size (int): Rozmiar planszy.
+        seed (int | np.random.SeedSequence | np.random.Generator, optional):
+            Ziarno strumienia losowego gry (np. dziecko z `SeedSequence.spawn`).
+        max_depth (int): Pojemność stosu cofania używanego przez symulacje AI.
     """
-    def __init__(self, size=4):
+    def __init__(self, size=4, seed=None, max_depth=32):
         self.size = size
+        self.spawn_rng = UniformBuffer(seed)
+        self._sim_board = np.zeros((size, size), dtype=np.uint8)
+        self._undo_boards = np.zeros((max_depth, size, size), dtype=np.uint8)
+        self._undo_masks = [None] * max_depth
+        self._undo_depth = 0
         self.reset()
 
+    @property
+    def exponents(self):
+        """np.ndarray: Plansza wykładników. Przypisanie nowej planszy unieważnia maskę ruchów."""
+        return self._exponents
+
+    @exponents.setter
+    def exponents(self, exponents):
+        self._exponents = exponents
+        self._legal_mask = None
+
+    @property
+    def board(self):
+        """np.ndarray: Plansza z wartościami kafelków (nowa macierz przy każdym odczycie)."""
+        return exponents_to_values(self._exponents)
+
+    @board.setter
+    def board(self, board):
+        self.exponents = values_to_exponents(board)
+
+    @property
+    def legal_mask(self):
+        """int: Maska legalnych ruchów liczona raz na stan planszy."""
+        if self._legal_mask is None:
+            self._legal_mask = self._compute_legal_mask()
+        return self._legal_mask
+
+    @property
+    def done(self):
+        """bool: True jeśli na planszy nie ma już żadnego legalnego ruchu."""
+        return self.legal_mask == 0
+
+    def _compute_legal_mask(self):
+        """
+        Oblicza maskę legalnych ruchów dla wszystkich kierunków w jednym przebiegu.
+
+        Plansza 4x4 jest pakowana do bitboardu i sprawdzana tablicami wierszy,
+        inne rozmiary porównują sąsiadów poziomych i pionowych wektorowo.
+
+        Returns:
+            int: Maska bitowa w kolejności `DIRECTIONS` (0 oznacza Game Over).
+        """
+        board = self.exponents
+        jit = kernels.active()
+        if jit is not None:
+            return jit.legal_mask(board)
+        if self.size == 4:
+            return legal_moves_mask(exponents_to_bitboard(board))
+
+        a, b = board[:, :-1], board[:, 1:]
+        c, d = board[:-1, :], board[1:, :]
+        merge_h = np.any((a == b) & (a != 0))
+        merge_v = np.any((c == d) & (c != 0))
+        return int(merge_h or np.any((a == 0) & (b != 0))) | \
+               int(merge_h or np.any((b == 0) & (a != 0))) << 1 | \
+               int(merge_v or np.any((c == 0) & (d != 0))) << 2 | \
+               int(merge_v or np.any((d == 0) & (c != 0))) << 3
+
     def reset(self):
         """
         Resetuje grę do stanu początkowego.
@@ -24,28 +131,31 @@ class Game2048:
         Zeruje planszę i wynik, a następnie dodaje dwa losowe kafelki startowe.
 
         Returns:
-            np.ndarray: Kopia planszy (stan początkowy).
+            np.ndarray: Kopia planszy wykładników (stan początkowy).
         """
-        self.board = np.zeros((self.size, self.size), dtype=int)
+        self.exponents = np.zeros((self.size, self.size), dtype=np.uint8)
         self.score = 0
         self._add_random_tile()
         self._add_random_tile()
-        return self.board.copy()
+        return self.exponents.copy()
 
     def _add_random_tile(self):
         """
         Dodaje losowy kafelek (2 lub 4) na losowym pustym polu.
 
-        Prawdopodobieństwo: 90% na '2', 10% na '4'.
+        Prawdopodobieństwo: 90% na '2', 10% na '4'. Pole jest wybierane
+        bezpośrednio z maski bitowej pustych pól, bez budowania list.
 
         Returns:
             bool: True jeśli dodano kafelek, False jeśli brak miejsca.
         """
-        empty_cells = list(zip(*np.where(self.board == 0)))
-        if not empty_cells:
+        empty = int.from_bytes(np.packbits(self.exponents.ravel() == 0, bitorder='little').tobytes(), 'little')
+        if not empty:
             return False
-        y, x = random.choice(empty_cells)
-        self.board[y, x] = 4 if random.random() < 0.1 else 2
+        pos = nth_set_bit(empty, int(self.spawn_rng.next() * bin(empty).count('1')))
+        y, x = divmod(pos, self.size)
+        self.exponents[y, x] = 2 if self.spawn_rng.next() < 0.1 else 1
+        self._legal_mask = None
         return True
 
     def _compress(self, row):
@@ -53,7 +163,7 @@ class Game2048:
         Przesuwa niezerowe elementy na początek listy (implementacja ruchu).
 
         Args:
-            row (list): Wiersz planszy.
+            row (list): Wiersz planszy (wykładniki).
 
         Returns:
             list: Nowy wiersz z przesuniętymi elementami.
@@ -66,8 +176,11 @@ class Game2048:
         """
         Łączy sąsiadujące identyczne klocki w wierszu.
 
+        Połączenie dwóch klocków o wykładniku e daje wykładnik e + 1
+        i 2^(e + 1) punktów.
+
         Args:
-            row (list): Wiersz po operacji compress.
+            row (list): Wiersz wykładników po operacji compress.
 
         Returns:
             tuple: (zmieniony_wiersz, zdobyte_punkty)
@@ -75,8 +188,8 @@ class Game2048:
         points = 0
         for i in range(self.size - 1):
             if row[i] != 0 and row[i] == row[i + 1]:
-                row[i] *= 2
-                points += row[i]  
+                row[i] += 1
+                points += 1 << row[i]
                 row[i + 1] = 0
         return row, points
 
@@ -87,12 +200,17 @@ class Game2048:
         Sekwencja: compress -> merge -> compress.
 
         Args:
-            row (np.ndarray): Pojedynczy wiersz planszy.
+            row (np.ndarray): Pojedynczy wiersz planszy (wykładniki).
 
         Returns:
             tuple: (przetworzony_wiersz, punkty_za_ten_wiersz)
         """
-        curr_row = list(row)
+        jit = kernels.active()
+        if jit is not None:
+            new_rows, points = jit.move_rows_left(np.asarray(row, dtype=np.uint8)[None, :])
+            return new_rows[0].tolist(), points
+
+        curr_row = [int(e) for e in row]
         curr_row = self._compress(curr_row)
         curr_row, points = self._merge(curr_row)
         curr_row = self._compress(curr_row)
@@ -108,7 +226,7 @@ class Game2048:
             direction (str): Kierunek ruchu ('left', 'up', 'right', 'down').
 
         Returns:
-            tuple: (nowa_plansza, nagroda_za_ruch, czy_zaszla_zmiana)
+            tuple: (nowa_plansza_wykładników, nagroda_za_ruch, czy_zaszla_zmiana)
         
         Raises:
             ValueError: Jeśli podano nieznany kierunek.
@@ -117,18 +235,23 @@ class Game2048:
         if direction not in rotations: raise ValueError("Błąd kierunku")
         k = rotations[direction]
 
-        board_working = np.rot90(self.board, k=k)
-        new_rows = []
-        step_reward = 0
+        board_working = np.rot90(self.exponents, k=k)
+        jit = kernels.active()
+        if jit is not None:
+            new_board, step_reward = jit.move_rows_left(board_working)
+        else:
+            new_rows = []
+            step_reward = 0
 
-        for row in board_working:
-            processed, points = self._move_row_left(row)
-            new_rows.append(processed)
-            step_reward += points
+            for row in board_working:
+                processed, points = self._move_row_left(row)
+                new_rows.append(processed)
+                step_reward += points
 
-        new_board = np.array(new_rows)
-        new_board = np.rot90(new_board, k=-k)
-        changed = not np.array_equal(self.board, new_board)
+            new_board = np.array(new_rows, dtype=np.uint8)
+        # Kopia ciągła: widok `rot90` jako plansza gry psułby zapisy w miejscu (`move_into`).
+        new_board = np.ascontiguousarray(np.rot90(new_board, k=-k))
+        changed = not np.array_equal(self.exponents, new_board)
 
         return new_board, step_reward, changed
 
@@ -142,11 +265,103 @@ class Game2048:
             direction (str): Kierunek ruchu.
 
         Returns:
-            tuple: (nowa_plansza, nagroda, czy_zmiana)
+            tuple: (nowa_plansza_wykładników, nagroda, czy_zmiana)
         """
         new_board, reward, changed = self._calculate_move_result(direction)
-        self.board = new_board
-        return self.board, reward, changed
+        self.exponents = new_board
+        return self.exponents, reward, changed
+
+    def move_into(self, direction, out):
+        """
+        Zapisuje wynik ruchu (bez losowego kafelka) do bufora podanego przez wywołującego.
+
+        Stan gry nie jest zmieniany, chyba że `out` to sama plansza gry.
+        Plansza 4x4 jest przesuwana tablicami wierszy bez tworzenia nowej macierzy.
+
+        Args:
+            direction (str): Kierunek ruchu.
+            out (np.ndarray): Ciągła macierz NxN wykładników (dtype=uint8) na wynik.
+
+        Returns:
+            tuple: (nagroda, czy_zmiana)
+        """
+        if self.size == 4:
+            bb = exponents_to_bitboard(self.exponents)
+            new_bb, reward = move_bitboard(bb, direction)
+            bitboard_into(new_bb, out)
+            changed = new_bb != bb
+        else:
+            new_board, reward, changed = self._calculate_move_result(direction)
+            np.copyto(out, new_board)
+        if out is self.exponents:
+            self._legal_mask = None
+        return reward, changed
+
+    def load_state(self, board):
+        """
+        Kopiuje planszę do własnego bufora symulacji i czyści stos cofania.
+
+        Dzięki kopii ruchy `push_move` w symulacji nigdy nie modyfikują
+        planszy prawdziwej gry (brak aliasingu).
+
+        Args:
+            board (np.ndarray): Plansza wykładników - stan startowy symulacji.
+        """
+        np.copyto(self._sim_board, board)
+        self.exponents = self._sim_board
+        self._undo_depth = 0
+
+    def push_state(self):
+        """
+        Odkłada bieżącą planszę na prealokowany stos cofania.
+
+        Raises:
+            IndexError: Jeśli stos cofania jest pełny.
+        """
+        if self._undo_depth >= len(self._undo_boards):
+            raise IndexError("Przepełnienie stosu cofania")
+        np.copyto(self._undo_boards[self._undo_depth], self.exponents)
+        self._undo_masks[self._undo_depth] = self._legal_mask
+        self._undo_depth += 1
+
+    def pop_state(self):
+        """
+        Przywraca planszę zapisaną ostatnim `push_state`/`push_move`/`push_tile`.
+
+        Raises:
+            IndexError: Jeśli stos cofania jest pusty.
+        """
+        if self._undo_depth == 0:
+            raise IndexError("Pusty stos cofania")
+        self._undo_depth -= 1
+        np.copyto(self.exponents, self._undo_boards[self._undo_depth])
+        self._legal_mask = self._undo_masks[self._undo_depth]
+
+    def push_move(self, direction):
+        """
+        Wykonuje ruch symulacyjny w miejscu, odkładając poprzedni stan na stos.
+
+        Args:
+            direction (str): Kierunek ruchu.
+
+        Returns:
+            tuple: (nagroda, czy_zmiana)
+        """
+        self.push_state()
+        return self.move_into(direction, self.exponents)
+
+    def push_tile(self, y, x, exponent):
+        """
+        Stawia kafelek (np. w węźle losowym), odkładając poprzedni stan na stos.
+
+        Args:
+            y (int): Wiersz pola.
+            x (int): Kolumna pola.
+            exponent (int): Wykładnik kafelka (1 dla '2', 2 dla '4').
+        """
+        self.push_state()
+        self.exponents[y, x] = exponent
+        self._legal_mask = None
 
     def move(self, direction):
         """
@@ -161,17 +376,18 @@ class Game2048:
             direction (str): Kierunek ruchu (w/s/a/d lub nazwy pełne).
 
         Returns:
-            tuple: (kopia_planszy, nagroda, czy_koniec, czy_zmieniono)
+            tuple: (kopia_planszy_wykładników, nagroda, czy_koniec, czy_zmieniono)
         """
         new_board, reward, changed = self._calculate_move_result(direction)
-        self.board = new_board
+        self.exponents = new_board
 
         if changed:
             self.score += reward
             self._add_random_tile()
 
+        self._legal_mask = self._compute_legal_mask()
         done = not self._can_move()
-        return self.board.copy(), reward, done, changed
+        return self.exponents.copy(), reward, done, changed
 
     def _can_move(self):
         """
@@ -180,22 +396,14 @@ class Game2048:
         Returns:
             bool: True jeśli gra może trwać dalej, False jeśli Game Over.
         """
-        if np.any(self.board == 0):
-            return True
-        for y in range(self.size):
-            for x in range(self.size - 1):
-                if self.board[y, x] == self.board[y, x + 1]:
-                    return True
-                if self.board[x, y] == self.board[x + 1, y]:
-                    return True
-        return False
+        return self.legal_mask != 0
 
 
     def can_move_direction(self, direction):
         """
         Szybkie sprawdzenie czy ruch w danym kierunku jest legalny.
-        
-        Zoptymalizowane pod kątem wydajności (używa widoków numpy bez kopiowania).
+
+        Odczytuje bit z `legal_mask`, więc plansza nie jest ponownie skanowana.
 
         Args:
             direction (str): Kierunek do sprawdzenia.
@@ -203,22 +411,7 @@ class Game2048:
         Returns:
             bool: True jeśli ruch spowoduje zmianę stanu planszy.
         """
-        rotations = {'left': 0, 'up': 1, 'right': 2, 'down': 3}
-        k = rotations[direction]
-        board_view = np.rot90(self.board, k=k)
-
-        for row in board_view:
-            prev = -1
-            for x in row:
-                if x == 0:
-                    prev = 0 
-                elif prev == 0:
-                    return True 
-                elif x == prev:
-                    return True 
-                else:
-                    prev = x
-        return False
+        return bool(self.legal_mask >> DIRECTIONS.index(direction) & 1)
 
     def get_valid_moves(self):
         """
@@ -227,8 +420,8 @@ class Game2048:
         Returns:
             list[str]: Lista kierunków np. ['left', 'up'].
         """
-        return [d for d in ['left', 'right', 'up', 'down']
-                if self.can_move_direction(d)]
+        mask = self.legal_mask
+        return [d for i, d in enumerate(DIRECTIONS) if mask >> i & 1]
 
     def print_board(self):
         """Wypisuje obecny stan planszy i wynik w konsoli."""
@@ -236,6 +429,200 @@ class Game2048:
         print(f"Score: {self.score}\n")
 
 
+_NIBBLE_SHIFTS = np.array([0, 4, 8, 12], dtype=np.uint16)
+
+
+def _rows_to_keys(rows):
+    """Pakuje wiersze wykładników (..., 4) do 16-bitowych indeksów tablic wierszy."""
+    return (rows.astype(np.uint16) << _NIBBLE_SHIFTS).sum(axis=-1, dtype=np.uint16)
+
+
+def _keys_to_rows(keys):
+    """Rozpakowuje 16-bitowe indeksy wierszy do tablicy wykładników (..., 4)."""
+    return ((keys[..., None] >> _NIBBLE_SHIFTS) & 0xF).astype(np.uint8)
+
+
+def _orient(boards, d):
+    """Obraca plansze (N,4,4) tak, aby ruch w kierunku `DIRECTIONS[d]` był ruchem w lewo."""
+    if d == 1:
+        return boards[:, :, ::-1]
+    if d == 2:
+        return boards.transpose(0, 2, 1)
+    if d == 3:
+        return boards.transpose(0, 2, 1)[:, :, ::-1]
+    return boards
+
+
+def _unorient(boards, d):
+    """Odwrotność `_orient` - przywraca pierwotną orientację plansz."""
+    if d == 3:
+        return boards[:, :, ::-1].transpose(0, 2, 1)
+    return _orient(boards, d)
+
+
+class BatchGame2048:
+    """
+    Silnik prowadzący N gier 2048 jednocześnie (lockstep).
+
+    Plansze są trzymane jako jedna tablica `(N,4,4)` wykładników (0 = puste
+    pole), a ruch, dodanie kafelka i sprawdzenie końca gry wykonywane są
+    kilkoma zwektoryzowanymi operacjami numpy dla całej partii naraz.
+    Ruchy korzystają z tych samych tablic wierszy co `BitboardGame2048`.
+
+    Attributes:
+        n_games (int): Liczba równoległych gier.
+        exponents (np.ndarray): Plansze `(N,4,4)` jako wykładniki (uint8).
+        scores (np.ndarray): Wyniki punktowe gier `(N,)`.
+        moves (np.ndarray): Liczba wykonanych ruchów w każdej grze `(N,)`.
+        done (np.ndarray): Maska zakończonych gier `(N,)`.
+        legal (np.ndarray): Maska legalnych ruchów `(N,4)` w kolejności `DIRECTIONS`.
+        auto_reset (bool): Czy zakończone gry są od razu restartowane.
+        final_scores (np.ndarray): Wynik końcowy gier zakończonych w ostatnim kroku.
+        final_boards (np.ndarray): Plansze końcowe (wartości) gier zakończonych w ostatnim kroku.
+    """
+    def __init__(self, n_games, auto_reset=True, seed=None):
+        self.n_games = n_games
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    @property
+    def boards(self):
+        """np.ndarray: Plansze `(N,4,4)` z wartościami kafelków (do wyświetlania i oceny)."""
+        return exponents_to_values(self.exponents)
+
+    def reset(self, mask=None):
+        """
+        Resetuje wybrane gry (domyślnie wszystkie) do stanu początkowego.
+
+        Args:
+            mask (np.ndarray, optional): Maska `(N,)` gier do zresetowania.
+        """
+        if mask is None:
+            mask = np.ones(self.n_games, dtype=bool)
+            self.exponents = np.zeros((self.n_games, 4, 4), dtype=np.uint8)
+            self.scores = np.zeros(self.n_games, dtype=np.int64)
+            self.moves = np.zeros(self.n_games, dtype=np.int64)
+            self.done = np.zeros(self.n_games, dtype=bool)
+            self.final_scores = np.zeros(self.n_games, dtype=np.int64)
+            self.final_boards = np.zeros((self.n_games, 4, 4), dtype=np.int64)
+
+        self.exponents[mask] = 0
+        self.scores[mask] = 0
+        self.moves[mask] = 0
+        self.done[mask] = False
+        self._add_random_tiles(mask)
+        self._add_random_tiles(mask)
+        self.legal = self._legal_moves()
+
+    def _add_random_tiles(self, mask):
+        """
+        Dodaje po jednym losowym kafelku (2 lub 4) w grach wskazanych maską.
+
+        Losowe pole wybierane jest jako argmax losowych kluczy po pustych polach.
+
+        Args:
+            mask (np.ndarray): Maska `(N,)` gier, w których dodać kafelek.
+        """
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        flat = self.exponents.reshape(self.n_games, 16)
+        keys = self.rng.random((idx.size, 16))
+        keys[flat[idx] != 0] = -1.0
+        cells = np.argmax(keys, axis=1)
+        has_room = keys[np.arange(idx.size), cells] >= 0
+        tiles = np.where(self.rng.random(idx.size) < 0.1, 2, 1).astype(np.uint8)
+        flat[idx[has_room], cells[has_room]] = tiles[has_room]
+
+    def _legal_moves(self):
+        """
+        Oblicza maskę legalnych ruchów `(N,4)` dla wszystkich plansz.
+
+        Returns:
+            np.ndarray: Maska bool w kolejności `DIRECTIONS`.
+        """
+        legal = np.empty((self.n_games, 4), dtype=bool)
+        for d in range(4):
+            keys = _rows_to_keys(_orient(self.exponents, d))
+            legal[:, d] = np.any(ROW_CHANGED_TABLE[keys], axis=1)
+        return legal
+
+    def afterstates(self):
+        """
+        Oblicza plansze po każdym z 4 ruchów (bez losowego kafelka) we wszystkich grach.
+
+        Stan gier nie jest zmieniany. Nielegalne ruchy dają planszę bez zmian
+        (patrz `legal`).
+
+        Returns:
+            tuple: (plansze `(N,4,4,4)` - druga oś w kolejności `DIRECTIONS`,
+                nagrody `(N,4)`)
+        """
+        boards = np.empty((self.n_games, 4, 4, 4), dtype=np.uint8)
+        rewards = np.empty((self.n_games, 4), dtype=np.int64)
+        for d in range(4):
+            keys = _rows_to_keys(_orient(self.exponents, d))
+            boards[:, d] = _unorient(_keys_to_rows(ROW_LEFT_TABLE[keys]), d)
+            rewards[:, d] = ROW_SCORE_TABLE[keys].sum(axis=1)
+        return boards, rewards
+
+    def step(self, directions):
+        """
+        Wykonuje po jednym ruchu w każdej grze.
+
+        Gry zakończone są restartowane (`auto_reset=True`) albo pomijane
+        w kolejnych krokach (`auto_reset=False`). Wynik i plansza końcowa gier
+        zakończonych w tym kroku trafiają do `final_scores`/`final_boards`.
+
+        Args:
+            directions (array-like): Kierunek dla każdej gry - indeks w `DIRECTIONS`
+                albo nazwa ('left', 'right', 'up', 'down').
+
+        Returns:
+            tuple: (nagrody, czy_zmieniono, czy_koniec) - tablice `(N,)`.
+
+        Raises:
+            ValueError: Jeśli podano nieznany kierunek.
+        """
+        directions = np.asarray(directions)
+        if directions.dtype.kind in 'US':
+            if not set(directions.tolist()) <= set(DIRECTIONS): raise ValueError("Błąd kierunku")
+            directions = np.array([DIRECTIONS.index(d) for d in directions.tolist()])
+        if directions.shape != (self.n_games,) or np.any((directions < 0) | (directions > 3)):
+            raise ValueError("Błąd kierunku")
+
+        rewards = np.zeros(self.n_games, dtype=np.int64)
+        changed = np.zeros(self.n_games, dtype=bool)
+        active = ~self.done
+
+        for d in range(4):
+            idx = np.flatnonzero(active & (directions == d))
+            if idx.size == 0:
+                continue
+            keys = _rows_to_keys(_orient(self.exponents[idx], d))
+            new_keys = ROW_LEFT_TABLE[keys]
+            rewards[idx] = ROW_SCORE_TABLE[keys].sum(axis=1)
+            changed[idx] = np.any(new_keys != keys, axis=1)
+            self.exponents[idx] = _unorient(_keys_to_rows(new_keys), d)
+
+        rewards[~changed] = 0
+        self.scores += rewards
+        self.moves += changed
+        self._add_random_tiles(changed)
+
+        self.legal = self._legal_moves()
+        finished = active & ~self.legal.any(axis=1)
+        self.done |= finished
+        done = self.done.copy()
+
+        if finished.any():
+            self.final_scores[finished] = self.scores[finished]
+            self.final_boards[finished] = self.boards[finished]
+            if self.auto_reset:
+                self.reset(finished)
+
+        return rewards, changed, done
 
 
 if __name__ == "__main__":
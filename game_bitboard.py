@@ -0,0 +1,624 @@
+import os
+import tempfile
+import numpy as np
+
+ROW_MASK = 0xFFFF
+DIRECTIONS = ['left', 'right', 'up', 'down']
+
+SPAWN_BUFFER_SIZE = 256
+EMPTY_NIBBLES = 0x1111111111111111
+
+TABLES_VERSION = 2
+TABLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           f"row_tables_v{TABLES_VERSION}.npy")
+
+
+def _reverse_row(row):
+    """Odwraca kolejność 4 półbajtów (kafelków) w 16-bitowym wierszu."""
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | \
+           ((row >> 4) & 0xF0) | ((row >> 12) & 0xF)
+
+
+def _build_row_tables():
+    """
+    Prekalkuluje tablice przejść dla wszystkich 65536 możliwych wierszy.
+
+    Wiersz to 4 wykładniki (po 4 bity), kolumna 0 w najmłodszych bitach.
+    Ruch w lewo wykonuje tę samą sekwencję compress -> merge -> compress
+    co `Game2048._move_row_left`. Wykładnik 15 (32768) jest nasycony:
+    dwa takie klocki nie są łączone, bo wynik nie zmieściłby się w 4 bitach.
+
+    Returns:
+        np.ndarray: Tablica (5, 65536) uint32 z wierszami:
+            0. wiersz po ruchu w lewo
+            1. wiersz po ruchu w prawo
+            2. punkty zdobyte w wierszu
+            3. flaga zmiany wiersza przy ruchu w lewo
+            4. wiersz odwrócony (lustro poziome)
+    """
+    tables = np.zeros((5, 65536), dtype=np.uint32)
+    row_left, row_right, row_score, row_changed, row_reverse = tables
+
+    for row in range(65536):
+        tiles = [(row >> (4 * i)) & 0xF for i in range(4)]
+        line = [t for t in tiles if t != 0]
+        merged = []
+        points = 0
+        i = 0
+        while i < len(line):
+            if i + 1 < len(line) and line[i] == line[i + 1] and line[i] < 15:
+                merged.append(line[i] + 1)
+                points += 1 << (line[i] + 1)
+                i += 2
+            else:
+                merged.append(line[i])
+                i += 1
+        merged += [0] * (4 - len(merged))
+
+        result = 0
+        for i, t in enumerate(merged):
+            result |= t << (4 * i)
+        row_left[row] = result
+        row_score[row] = points
+        row_changed[row] = result != row
+
+    for row in range(65536):
+        row_right[row] = _reverse_row(int(row_left[_reverse_row(row)]))
+        row_reverse[row] = _reverse_row(row)
+
+    return tables
+
+
+def load_row_tables(filename=TABLES_FILE):
+    """
+    Wczytuje tablice wierszy z pliku (memory-map) lub generuje je przy pierwszym użyciu.
+
+    Plik jest wersjonowany (`TABLES_VERSION` w nazwie) i otwierany przez
+    `np.load(mmap_mode='r')`, więc procesy robocze (np. `ProcessPoolExecutor`
+    w benchmarku) nie przeliczają tablic od nowa, a odczyty wektorowe
+    z tablic numpy korzystają ze wspólnych stron pamięci systemu. Moduł
+    trzyma jednak dodatkowo prywatne listy Pythona (`_ROW_LEFT` itd., ok. 10 MB
+    na proces) dla szybkich odczytów skalarnych - oszczędzana jest budowa
+    tablic, nie pamięć procesu. Zapis odbywa się do pliku tymczasowego
+    i atomowego `os.replace`, więc równoległe procesy nie widzą połówki pliku.
+
+    Args:
+        filename (str): Ścieżka do pliku z tablicami.
+
+    Returns:
+        np.ndarray: Tablica (5, 65536) uint32 (tylko do odczytu).
+    """
+    try:
+        tables = np.load(filename, mmap_mode='r')
+        if tables.shape == (5, 65536) and tables.dtype == np.uint32:
+            return tables
+    except (OSError, ValueError):
+        pass
+
+    tables = _build_row_tables()
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, tables)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filename)
+        return np.load(filename, mmap_mode='r')
+    except OSError as e:
+        print(f"Nie udało się zapisać tablic wierszy: {e}")
+        return tables
+
+
+ROW_TABLES = load_row_tables()
+ROW_LEFT_TABLE, ROW_RIGHT_TABLE, ROW_SCORE_TABLE, ROW_CHANGED_TABLE, ROW_REVERSE_TABLE = ROW_TABLES
+
+# Listy Pythona są szybsze od tablic numpy przy pojedynczych odczytach.
+# To prywatne kopie (ok. 10 MB na proces) - memory-map współdzieli tylko tablice numpy.
+_ROW_LEFT = ROW_LEFT_TABLE.tolist()
+_ROW_RIGHT = ROW_RIGHT_TABLE.tolist()
+_ROW_SCORE = ROW_SCORE_TABLE.tolist()
+_ROW_REVERSE = ROW_REVERSE_TABLE.tolist()
+
+
+def transpose(bb):
+    """
+    Transponuje planszę zapisaną jako 64-bitowa liczba (wiersze <-> kolumny).
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        int: Spakowana plansza po transpozycji.
+    """
+    a1 = bb & 0xF0F00F0FF0F00F0F
+    a2 = bb & 0x0000F0F00000F0F0
+    a3 = bb & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _apply_rows(bb, table):
+    """Nakłada tablicę przejść na każdy z 4 wierszy planszy."""
+    return table[bb & ROW_MASK] | \
+           (table[(bb >> 16) & ROW_MASK] << 16) | \
+           (table[(bb >> 32) & ROW_MASK] << 32) | \
+           (table[(bb >> 48) & ROW_MASK] << 48)
+
+
+def _rows_score(bb):
+    """Sumuje punkty zdobyte w 4 wierszach planszy."""
+    return _ROW_SCORE[bb & ROW_MASK] + \
+           _ROW_SCORE[(bb >> 16) & ROW_MASK] + \
+           _ROW_SCORE[(bb >> 32) & ROW_MASK] + \
+           _ROW_SCORE[(bb >> 48) & ROW_MASK]
+
+
+def move_bitboard(bb, direction):
+    """
+    Wykonuje deterministyczny ruch na spakowanej planszy.
+
+    Ruchy 'up'/'down' są realizowane przez transpozycję i ruch wierszy.
+
+    Args:
+        bb (int): Spakowana plansza.
+        direction (str): Kierunek ruchu ('left', 'up', 'right', 'down').
+
+    Returns:
+        tuple: (nowa_plansza, nagroda_za_ruch)
+
+    Raises:
+        ValueError: Jeśli podano nieznany kierunek.
+    """
+    if direction == 'left':
+        return _apply_rows(bb, _ROW_LEFT), _rows_score(bb)
+    if direction == 'right':
+        return _apply_rows(bb, _ROW_RIGHT), _rows_score(bb)
+    if direction == 'up':
+        t = transpose(bb)
+        return transpose(_apply_rows(t, _ROW_LEFT)), _rows_score(t)
+    if direction == 'down':
+        t = transpose(bb)
+        return transpose(_apply_rows(t, _ROW_RIGHT)), _rows_score(t)
+    raise ValueError("Błąd kierunku")
+
+
+def legal_moves_mask(bb):
+    """
+    Oblicza 4-bitową maskę legalnych ruchów w jednym przebiegu.
+
+    Bit i odpowiada kierunkowi `DIRECTIONS[i]` ('left', 'right', 'up', 'down').
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        int: Maska legalnych ruchów (0 oznacza koniec gry).
+    """
+    t = transpose(bb)
+    return (_apply_rows(bb, _ROW_LEFT) != bb) | \
+           ((_apply_rows(bb, _ROW_RIGHT) != bb) << 1) | \
+           ((_apply_rows(t, _ROW_LEFT) != t) << 2) | \
+           ((_apply_rows(t, _ROW_RIGHT) != t) << 3)
+
+
+def mirror_columns(bb):
+    """Odbija planszę w poziomie (kolumna 0 <-> kolumna 3) przy użyciu tablicy wierszy."""
+    return _apply_rows(bb, _ROW_REVERSE)
+
+
+def mirror_rows(bb):
+    """Odbija planszę w pionie (wiersz 0 <-> wiersz 3)."""
+    return ((bb & ROW_MASK) << 48) | (((bb >> 16) & ROW_MASK) << 32) | \
+           (((bb >> 32) & ROW_MASK) << 16) | (bb >> 48)
+
+
+# Każda z 8 symetrii kwadratu to złożenie: transpozycja? -> lustro kolumn? -> lustro wierszy?
+SYMMETRIES = [(t, h, v) for t in (0, 1) for h in (0, 1) for v in (0, 1)]
+
+_MOVE_TRANSPOSE = {'left': 'up', 'up': 'left', 'right': 'down', 'down': 'right'}
+_MOVE_MIRROR_COLUMNS = {'left': 'right', 'right': 'left', 'up': 'up', 'down': 'down'}
+_MOVE_MIRROR_ROWS = {'left': 'left', 'right': 'right', 'up': 'down', 'down': 'up'}
+
+
+def _symmetry_move(direction, symmetry):
+    """Zwraca kierunek na planszy oryginalnej odpowiadający ruchowi na planszy przekształconej."""
+    t, h, v = SYMMETRIES[symmetry]
+    if v:
+        direction = _MOVE_MIRROR_ROWS[direction]
+    if h:
+        direction = _MOVE_MIRROR_COLUMNS[direction]
+    if t:
+        direction = _MOVE_TRANSPOSE[direction]
+    return direction
+
+
+# SYMMETRY_MOVES[s][kierunek_na_planszy_kanonicznej] -> kierunek na planszy oryginalnej.
+SYMMETRY_MOVES = [{d: _symmetry_move(d, s) for d in DIRECTIONS} for s in range(len(SYMMETRIES))]
+
+
+def apply_symmetry(bb, symmetry):
+    """
+    Przekształca planszę jedną z 8 symetrii kwadratu (obroty i odbicia).
+
+    Args:
+        bb (int): Spakowana plansza.
+        symmetry (int): Indeks w `SYMMETRIES`.
+
+    Returns:
+        int: Przekształcona plansza.
+    """
+    t, h, v = SYMMETRIES[symmetry]
+    if t:
+        bb = transpose(bb)
+    if h:
+        bb = mirror_columns(bb)
+    if v:
+        bb = mirror_rows(bb)
+    return bb
+
+
+def canonical_bitboard(bb):
+    """
+    Wyznacza postać kanoniczną planszy: najmniejszy klucz spośród 8 symetrii.
+
+    Plansze różniące się tylko obrotem/odbiciem mają ten sam klucz, więc
+    cache, książki otwarć i zbiory danych mogą być nawet 8x mniejsze.
+    Ruch wybrany na planszy kanonicznej przekłada się na oryginał przez
+    `SYMMETRY_MOVES[symetria][ruch]`.
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        tuple: (plansza_kanoniczna, indeks_symetrii)
+    """
+    t = transpose(bb)
+    candidates = (bb, mirror_rows(bb))
+    h = mirror_columns(bb)
+    candidates += (h, mirror_rows(h), t, mirror_rows(t))
+    th = mirror_columns(t)
+    candidates += (th, mirror_rows(th))
+    best = min(candidates)
+    return best, candidates.index(best)
+
+
+def empty_mask_bitboard(bb):
+    """
+    Zwraca maskę pustych pól: najmłodszy bit każdego pustego półbajtu jest ustawiony.
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        int: Maska z bitami na pozycjach 4 * indeks_pola.
+    """
+    occupied = bb | (bb >> 1) | (bb >> 2) | (bb >> 3)
+    return ~occupied & EMPTY_NIBBLES
+
+
+def nth_set_bit(mask, n):
+    """
+    Zwraca pozycję n-tego (od 0) ustawionego bitu maski.
+
+    Args:
+        mask (int): Maska bitowa.
+        n (int): Numer bitu liczony od najmłodszego.
+
+    Returns:
+        int: Pozycja bitu.
+    """
+    for _ in range(n):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+class UniformBuffer:
+    """
+    Bufor liczb losowych z `numpy.random.Generator` do szybkiego losowania kafelków.
+
+    Pojedyncze wywołania generatora numpy są kosztowne, więc liczby
+    z przedziału [0, 1) są pobierane blokami po `SPAWN_BUFFER_SIZE`.
+    Sekwencja pozostaje w pełni odtwarzalna dla danego ziarna.
+
+    Attributes:
+        rng (np.random.Generator): Źródło liczb losowych.
+    """
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self._values = []
+        self._pos = 0
+
+    def next(self):
+        """
+        Zwraca kolejną liczbę losową z przedziału [0, 1).
+
+        Returns:
+            float: Liczba losowa.
+        """
+        if self._pos >= len(self._values):
+            self._values = self.rng.random(SPAWN_BUFFER_SIZE).tolist()
+            self._pos = 0
+        value = self._values[self._pos]
+        self._pos += 1
+        return value
+
+    def get_state(self):
+        """
+        Zwraca pełny stan strumienia: stan generatora i niewykorzystane liczby z bufora.
+
+        Returns:
+            tuple: (stan `bit_generator` (dict), lista pozostałych liczb z bufora)
+        """
+        return self.rng.bit_generator.state, self._values[self._pos:]
+
+    def set_state(self, generator_state, buffered):
+        """
+        Przywraca stan zapisany przez `get_state` (ta sama dalsza sekwencja liczb).
+
+        Args:
+            generator_state (dict): Stan `bit_generator`.
+            buffered (list): Niewykorzystane liczby z bufora.
+        """
+        self.rng.bit_generator.state = generator_state
+        self._values = list(buffered)
+        self._pos = 0
+
+
+def empty_cells_bitboard(bb):
+    """
+    Zwraca indeksy (0-15) pustych pól spakowanej planszy.
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        list[int]: Indeksy pól, gdzie indeks = 4 * wiersz + kolumna.
+    """
+    return [i for i in range(16) if not (bb >> (4 * i)) & 0xF]
+
+
+def board_to_bitboard(board):
+    """
+    Pakuje planszę numpy (wartości kafelków) do jednej 64-bitowej liczby.
+
+    Args:
+        board (np.ndarray): Plansza 4x4 z wartościami 0, 2, 4, 8...
+
+    Returns:
+        int: Spakowana plansza (4-bitowe wykładniki).
+    """
+    bb = 0
+    for i, v in enumerate(board.flat):
+        if v:
+            bb |= (int(v).bit_length() - 1) << (4 * i)
+    return bb
+
+
+# Wartości dwóch kafelków zapisanych w jednym bajcie (młodszy półbajt pierwszy).
+_BYTE_TILES = np.array([[(1 << (b & 0xF)) if b & 0xF else 0,
+                         (1 << (b >> 4)) if b >> 4 else 0] for b in range(256)], dtype=int)
+
+
+def bitboard_to_board(bb):
+    """
+    Rozpakowuje 64-bitową planszę do macierzy numpy z wartościami kafelków.
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        np.ndarray: Plansza 4x4 (dtype=int).
+    """
+    packed = np.frombuffer(bb.to_bytes(8, 'little'), dtype=np.uint8)
+    return _BYTE_TILES[packed].reshape(4, 4)
+
+
+# Wykładniki dwóch kafelków zapisanych w jednym bajcie (młodszy półbajt pierwszy).
+_BYTE_EXPONENTS = np.array([[b & 0xF, b >> 4] for b in range(256)], dtype=np.uint8)
+
+
+def exponents_to_bitboard(exponents):
+    """
+    Pakuje planszę wykładników 4x4 (uint8) do jednej 64-bitowej liczby.
+
+    Args:
+        exponents (np.ndarray): Plansza wykładników (0 = puste pole).
+
+    Returns:
+        int: Spakowana plansza.
+    """
+    flat = exponents.ravel()
+    return int.from_bytes((flat[0::2] | (flat[1::2] << 4)).astype(np.uint8).tobytes(), 'little')
+
+
+def bitboard_to_exponents(bb):
+    """
+    Rozpakowuje 64-bitową planszę do macierzy wykładników 4x4 (uint8).
+
+    Args:
+        bb (int): Spakowana plansza.
+
+    Returns:
+        np.ndarray: Plansza wykładników (dtype=uint8).
+    """
+    packed = np.frombuffer(bb.to_bytes(8, 'little'), dtype=np.uint8)
+    return _BYTE_EXPONENTS[packed].reshape(4, 4)
+
+
+def bitboard_into(bb, out):
+    """
+    Rozpakowuje 64-bitową planszę do istniejącej macierzy wykładników (bez alokacji nowej planszy).
+
+    Args:
+        bb (int): Spakowana plansza.
+        out (np.ndarray): Macierz 4x4 (dtype=uint8), nadpisywana w miejscu.
+    """
+    packed = np.frombuffer(bb.to_bytes(8, 'little'), dtype=np.uint8)
+    if not out.flags.c_contiguous:
+        # `reshape` widoku nieciągłego zwraca kopię - zapis by przepadł.
+        out[...] = _BYTE_EXPONENTS[packed].reshape(4, 4)
+        return
+    np.take(_BYTE_EXPONENTS, packed, axis=0, out=out.reshape(8, 2))
+
+
+class BitboardGame2048:
+    """
+    Alternatywny silnik gry 2048 oparty na 64-bitowej planszy.
+
+    Każde pole to 4-bitowy wykładnik (0 = puste pole), a ruchy są
+    wykonywane przez odczyt z prekalkulowanych tablic wierszy.
+    Udostępnia ten sam interfejs co `Game2048` (`move`, `move_without_random`,
+    `get_valid_moves`, atrybuty `exponents` i `board`), więc może go zastąpić
+    w treningu i benchmarku.
+
+    Samo jądro ruchu (`move_bitboard`) jest 13-30x szybsze od
+    `Game2048._calculate_move_result`; w pełnej pętli gry (ruch, dolosowanie
+    kafelka, legalne ruchy) zysk wynosi tylko ok. 4-6x, patrz
+    `benchmark_module.move_throughput_report`.
+
+    Attributes:
+        size (int): Rozmiar planszy (tylko 4).
+        bitboard (int): Spakowany stan planszy.
+        score (int): Aktualny wynik punktowy gry.
+        spawn_rng (UniformBuffer): Własny strumień losowy gry.
+
+    Args:
+        size (int): Rozmiar planszy (tylko 4).
+        seed (int | np.random.SeedSequence | np.random.Generator, optional):
+            Ziarno strumienia losowego gry.
+    """
+    def __init__(self, size=4, seed=None):
+        if size != 4:
+            raise ValueError("Silnik bitboard obsługuje tylko planszę 4x4")
+        self.size = size
+        self.spawn_rng = UniformBuffer(seed)
+        self.reset()
+
+    @property
+    def board(self):
+        """np.ndarray: Plansza z wartościami kafelków (rozpakowywana przy odczycie)."""
+        return bitboard_to_board(self.bitboard)
+
+    @board.setter
+    def board(self, board):
+        self.bitboard = board_to_bitboard(board)
+
+    @property
+    def exponents(self):
+        """np.ndarray: Plansza wykładników uint8 (rozpakowywana przy odczycie)."""
+        return bitboard_to_exponents(self.bitboard)
+
+    @exponents.setter
+    def exponents(self, exponents):
+        self.bitboard = exponents_to_bitboard(exponents)
+
+    def reset(self):
+        """
+        Resetuje grę do stanu początkowego.
+
+        Returns:
+            np.ndarray: Plansza wykładników z dwoma losowymi kafelkami.
+        """
+        self.bitboard = 0
+        self.score = 0
+        self._mask_bitboard = None
+        self._mask = 0
+        self._add_random_tile()
+        self._add_random_tile()
+        return self.exponents
+
+    def _add_random_tile(self):
+        """
+        Dodaje losowy kafelek (2 lub 4) na losowym pustym polu.
+
+        Returns:
+            bool: True jeśli dodano kafelek, False jeśli brak miejsca.
+        """
+        empty = empty_mask_bitboard(self.bitboard)
+        if not empty:
+            return False
+        shift = nth_set_bit(empty, int(self.spawn_rng.next() * bin(empty).count('1')))
+        self.bitboard |= (2 if self.spawn_rng.next() < 0.1 else 1) << shift
+        return True
+
+    def move_without_random(self, direction):
+        """
+        Symulacja ruchu dla AI: przesuwa planszę, ale NIE dodaje losowego kafelka.
+
+        Args:
+            direction (str): Kierunek ruchu.
+
+        Returns:
+            tuple: (nowa_plansza_wykładników, nagroda, czy_zmiana)
+        """
+        new_bb, reward = move_bitboard(self.bitboard, direction)
+        changed = new_bb != self.bitboard
+        self.bitboard = new_bb
+        return self.exponents, reward, changed
+
+    def move(self, direction):
+        """
+        Wykonuje ruch w prawdziwej grze (przesunięcie, wynik, nowy kafelek).
+
+        Args:
+            direction (str): Kierunek ruchu.
+
+        Returns:
+            tuple: (kopia_planszy_wykładników, nagroda, czy_koniec, czy_zmieniono)
+        """
+        new_bb, reward = move_bitboard(self.bitboard, direction)
+        changed = new_bb != self.bitboard
+        self.bitboard = new_bb
+
+        if changed:
+            self.score += reward
+            self._add_random_tile()
+
+        done = not self._can_move()
+        return self.exponents, reward, done, changed
+
+    def _legal_mask(self):
+        """Zwraca maskę legalnych ruchów, licząc ją tylko po zmianie planszy."""
+        if self._mask_bitboard != self.bitboard:
+            self._mask = legal_moves_mask(self.bitboard)
+            self._mask_bitboard = self.bitboard
+        return self._mask
+
+    def _can_move(self):
+        """
+        Sprawdza czy możliwy jest jakikolwiek ruch na planszy.
+
+        Returns:
+            bool: True jeśli gra może trwać dalej, False jeśli Game Over.
+        """
+        return self._legal_mask() != 0
+
+    def can_move_direction(self, direction):
+        """
+        Sprawdza czy ruch w danym kierunku jest legalny.
+
+        Args:
+            direction (str): Kierunek do sprawdzenia.
+
+        Returns:
+            bool: True jeśli ruch spowoduje zmianę stanu planszy.
+        """
+        if direction not in DIRECTIONS: raise ValueError("Błąd kierunku")
+        return bool(self._legal_mask() >> DIRECTIONS.index(direction) & 1)
+
+    def get_valid_moves(self):
+        """
+        Zwraca listę wszystkich legalnych ruchów w danym stanie.
+
+        Returns:
+            list[str]: Lista kierunków np. ['left', 'up'].
+        """
+        mask = self._legal_mask()
+        return [d for i, d in enumerate(DIRECTIONS) if mask >> i & 1]
+
+    def print_board(self):
+        """Wypisuje obecny stan planszy i wynik w konsoli."""
+        print(self.board)
+        print(f"Score: {self.score}\n")
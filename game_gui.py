@@ -16,6 +16,7 @@ class Game2048App:
         root (tk.Tk): Główny obiekt okna Tkinter.
         game (Game2048): Instancja logiki gry.
         ai (AIPlayer): Instancja sztucznej inteligencji.
+        ai_time_budget (float): Czas na decyzję AI w sekundach (siła gry kosztem opóźnienia).
         canvas (tk.Canvas): Płótno do rysowania kafelków.
     """
     def __init__(self, root, size=4):
@@ -24,8 +25,9 @@ class Game2048App:
         self.game = Game2048(size)
 
         self.ai = AIPlayer()
+        self.ai.search_backend = 'expectimax'
 
-        loaded_episode = self.ai.load_model("ai_2048_save.pkl")
+        loaded_episode = self.ai.load_model("ai_2048_save.npz") or self.ai.load_model("ai_2048_save.pkl")
 
         print("-" * 40)
         if loaded_episode > 0:
@@ -40,7 +42,7 @@ class Game2048App:
         
 
         self.ai_running = False
-        self.sim_game = Game2048(size)  
+        self.ai_time_budget = 0.05
 
         self.root.title("2048 - Tkinter")
         self.root.resizable(False, False)
@@ -225,9 +227,10 @@ class Game2048App:
         self.tile_objects = {}
         self.tile_count = 0
 
+        board = self.game.board
         for r in range(self.size):
             for c in range(self.size):
-                value = int(self.game.board[r][c])
+                value = int(board[r][c])
                 if value != 0:
                     tile_id = self._draw_tile(value, c, r)
                     new_tile_objects[(r, c)] = tile_id
@@ -329,19 +332,7 @@ class Game2048App:
             self.show_popup()
             return
 
-        state = self.game.board.copy()
-        best_move, best_v = None, -float('inf')
-
-        for move in valid_moves:
-            self.sim_game.board = state.copy()
-            next_s_sim, _, _ = self.sim_game.move_without_random(move)
-
- 
-            v = self.ai.get_expected_value(next_s_sim)
-
-            if v > best_v:
-                best_v = v
-                best_move = move
+        best_move = self.ai.choose_move(self.game.exponents, time_budget=self.ai_time_budget)
 
         if best_move:
             _, _, done, changed = self.game.move(best_move)
@@ -0,0 +1,259 @@
+"""
+Moduł z wymiennym backendem jąder obliczeniowych (pętle skalarne po polach planszy).
+
+Jądra to zwykłe funkcje Pythona na tablicach uint8, napisane w podzbiorze
+języka zgodnym z Numbą. Backend 'numba' kompiluje je (`numba.njit`) przy
+pierwszym użyciu; backend 'numpy' oznacza dotychczasowy kod Python/NumPy
+w `Game2048` i `AIPlayer`, który pozostaje wzorcem wyników.
+
+Backend wybiera jeden przełącznik - `set_backend`. Domyślnie używana jest
+Numba, jeśli jest zainstalowana.
+"""
+from types import SimpleNamespace
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ('numpy', 'numba')
+BACKEND = 'numba' if numba is not None else 'numpy'
+
+_compiled = None
+
+
+def move_rows_left(rows):
+    """
+    Przesuwa w lewo wszystkie wiersze planszy (compress -> merge -> compress).
+
+    Args:
+        rows (np.ndarray): Plansza wykładników (uint8), może być widokiem (np. `np.rot90`).
+
+    Returns:
+        tuple: (nowa_plansza uint8, suma_punktów)
+    """
+    n, m = rows.shape
+    out = np.zeros((n, m), dtype=np.uint8)
+    points = 0
+    for r in range(n):
+        k = 0
+        last = 0
+        for i in range(m):
+            v = np.int64(rows[r, i])
+            if v == 0:
+                continue
+            if v == last:
+                out[r, k - 1] = v + 1
+                points += 1 << (v + 1)
+                last = 0
+            else:
+                out[r, k] = v
+                k += 1
+                last = v
+    return out, points
+
+
+def legal_mask(board):
+    """
+    Maska legalnych ruchów w kolejności `DIRECTIONS` (left, right, up, down).
+
+    Args:
+        board (np.ndarray): Plansza NxN wykładników (uint8).
+
+    Returns:
+        int: Maska bitowa (0 oznacza Game Over).
+    """
+    n = board.shape[0]
+    mask = 0
+    for r in range(n):
+        for c in range(n - 1):
+            a = board[r, c]
+            b = board[r, c + 1]
+            if a != 0 and a == b:
+                mask |= 3
+            elif a == 0 and b != 0:
+                mask |= 1
+            elif b == 0 and a != 0:
+                mask |= 2
+
+            a = board[c, r]
+            b = board[c + 1, r]
+            if a != 0 and a == b:
+                mask |= 12
+            elif a == 0 and b != 0:
+                mask |= 4
+            elif b == 0 and a != 0:
+                mask |= 8
+    return mask
+
+
+def board_terms(flat, gradient_matrix):
+    """
+    Wszystkie składniki oceny planszy 4x4 w jednym przebiegu (jak `AIPlayer._fused_terms`).
+
+    Args:
+        flat (np.ndarray): Spłaszczona plansza 16 wykładników (uint8).
+        gradient_matrix (np.ndarray): Maski gradientów (8, 16), int64.
+
+    Returns:
+        tuple: (wektor 6 cech, liczba_pustych, gładkość, izolacja)
+    """
+    merges = 0
+    smoothness = 0
+    has_neighbor = np.zeros(16, dtype=np.bool_)
+    for r in range(4):
+        for c in range(3):
+            for vertical in range(2):
+                if vertical:
+                    i, j = 4 * c + r, 4 * c + r + 4
+                else:
+                    i, j = 4 * r + c, 4 * r + c + 1
+                a = np.int64(flat[i])
+                b = np.int64(flat[j])
+                if a and b:
+                    if a == b:
+                        merges += 1
+                        has_neighbor[i] = True
+                        has_neighbor[j] = True
+                    else:
+                        smoothness -= abs(a - b)
+
+    isolation = 0
+    empty_count = 0
+    max_val = 0
+    max_pos = 0
+    for i in range(16):
+        v = np.int64(flat[i])
+        if v == 0:
+            empty_count += 1
+        elif not has_neighbor[i]:
+            isolation += 1
+        if v > max_val:
+            max_val = v
+            max_pos = i
+
+    r, c = divmod(max_pos, 4)
+    is_corner = 1.0 if (r == 0 or r == 3) and (c == 0 or c == 3) else 0.0
+
+    neighbor_bonus = 0.0
+    if r > 0:
+        neighbor_bonus += flat[max_pos - 4]
+    if r < 3:
+        neighbor_bonus += flat[max_pos + 4]
+    if c > 0:
+        neighbor_bonus += flat[max_pos - 1]
+    if c < 3:
+        neighbor_bonus += flat[max_pos + 1]
+
+    best_gradient = 0
+    for g in range(gradient_matrix.shape[0]):
+        score = 0
+        for i in range(16):
+            score += gradient_matrix[g, i] * np.int64(flat[i])
+        if score > best_gradient:
+            best_gradient = score
+
+    features = np.empty(6)
+    features[0] = empty_count / 16.0
+    features[1] = max_val / 16.0
+    features[2] = best_gradient / 1000.0
+    features[3] = min(merges / 10.0, 1.0)
+    features[4] = is_corner
+    features[5] = min(neighbor_bonus / 40.0, 1.0)
+    return features, empty_count, smoothness, isolation
+
+
+_SCALAR = SimpleNamespace(move_rows_left=move_rows_left, legal_mask=legal_mask,
+                          board_terms=board_terms)
+
+
+def set_backend(name):
+    """
+    Wybiera backend jąder dla całego procesu.
+
+    Prośba o 'numba' bez zainstalowanej Numby przełącza na 'numpy'.
+
+    Args:
+        name (str): 'numba' albo 'numpy'.
+
+    Raises:
+        ValueError: Jeśli podano nieznany backend.
+    """
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError("Błąd backendu jąder")
+    if name == 'numba' and numba is None:
+        print("--> Numba niedostępna, używam backendu 'numpy'")
+        name = 'numpy'
+    BACKEND = name
+
+
+def active():
+    """
+    Zwraca skompilowane jądra albo None, gdy wybrany jest backend 'numpy'.
+
+    Kompilacja odbywa się raz na proces, przy pierwszym wywołaniu.
+
+    Returns:
+        SimpleNamespace | None: Funkcje `move_rows_left`, `legal_mask`, `board_terms`.
+    """
+    global _compiled
+    if BACKEND != 'numba':
+        return None
+    if _compiled is None:
+        jit = numba.njit(cache=True)
+        _compiled = SimpleNamespace(move_rows_left=jit(move_rows_left), legal_mask=jit(legal_mask),
+                                    board_terms=jit(board_terms))
+    return _compiled
+
+
+def check_backends(n_boards=1000, seed=0):
+    """
+    Porównuje jądra z kodem Python/NumPy na losowych planszach.
+
+    Sprawdzane są: ruchy we wszystkich kierunkach (plansza i punkty), maska
+    legalnych ruchów oraz cechy, gładkość i izolacja z `AIPlayer`. Bez Numby
+    porównywane są nieskompilowane źródła jąder (ta sama logika).
+
+    Args:
+        n_boards (int): Liczba losowych plansz.
+        seed (int): Ziarno generatora plansz.
+
+    Returns:
+        bool: True jeśli wszystkie wyniki są identyczne.
+    """
+    from game_2048 import Game2048
+    from ai_player import AIPlayer
+
+    previous = BACKEND
+    kernels = active() or _SCALAR
+    set_backend('numpy')
+    try:
+        rng = np.random.default_rng(seed)
+        boards = rng.integers(1, 12, size=(n_boards, 4, 4)).astype(np.uint8)
+        boards[rng.random((n_boards, 4, 4)) < 0.4] = 0
+
+        game = Game2048()
+        ai = AIPlayer()
+        mismatches = 0
+        for board in boards:
+            game.exponents = board.copy()
+            ok = kernels.legal_mask(board) == game.legal_mask
+            for k, direction in enumerate(['left', 'up', 'right', 'down']):
+                expected, points, _ = game._calculate_move_result(direction)
+                moved, kernel_points = kernels.move_rows_left(np.rot90(board, k=k))
+                ok &= np.array_equal(np.rot90(moved, k=-k), expected) and kernel_points == points
+
+            features, empty_count, smoothness, isolation = kernels.board_terms(board.ravel(), ai.gradient_matrix)
+            ok &= np.array_equal(features, ai.get_features(board))
+            ok &= empty_count == int((board == 0).sum())
+            ok &= smoothness == ai._calculate_smoothness(board)
+            ok &= isolation == ai._calculate_isolation_penalty(board)
+            mismatches += not ok
+    finally:
+        set_backend(previous)
+
+    label = 'numba' if kernels is not _SCALAR else 'źródła bez kompilacji'
+    print(f"--> Jądra ({label}) vs NumPy: {n_boards - mismatches}/{n_boards} plansz zgodnych")
+    return mismatches == 0
@@ -0,0 +1,180 @@
+"""
+Moduł z siecią n-krotek (N-tuple network) - tablicową funkcją wartości planszy.
+"""
+import numpy as np
+
+# Domyślne krotki (indeksy płaskie planszy 4x4): dwie 6-krotki i cztery 4-krotki.
+DEFAULT_TUPLES = [
+    (0, 1, 2, 3, 4, 5),
+    (4, 5, 6, 7, 8, 9),
+    (0, 1, 2, 3),
+    (4, 5, 6, 7),
+    (0, 1, 4, 5),
+    (5, 6, 9, 10),
+]
+
+# Liczba możliwych wartości pola (wykładniki 0..15).
+CELL_VALUES = 16
+
+
+def _symmetric_cells():
+    """
+    Zwraca 8 permutacji pól planszy odpowiadających symetriom kwadratu.
+
+    Returns:
+        list[np.ndarray]: Permutacje `p` takie, że pole `i` przechodzi na `p[i]`.
+    """
+    grid = np.arange(16).reshape(4, 4)
+    perms = []
+    for k in range(4):
+        rot = np.rot90(grid, k)
+        perms.append(rot.ravel())
+        perms.append(np.fliplr(rot).ravel())
+    return perms
+
+
+class NTupleNetwork:
+    """
+    Sieć n-krotek: wartość planszy to suma wag odczytanych z tablic krotek.
+
+    Każda krotka to lista pól; wykładniki na tych polach tworzą indeks
+    (liczba w systemie o podstawie 16) do tablicy wag krotki. Krotka jest
+    odczytywana w 8 symetrycznych położeniach, które dzielą tę samą tablicę.
+    Wszystkie tablice leżą w jednej płaskiej tablicy `weights` (float32),
+    a cechy planszy to po prostu wektor indeksów do niej.
+
+    Attributes:
+        tuples (list): Krotki (indeksy płaskie pól).
+        weights (np.ndarray): Płaska tablica wag (float32).
+        alpha (float): Krok uczenia na jeden odczyt.
+
+    Args:
+        tuples (list, optional): Krotki 4- i 6-polowe (domyślnie `DEFAULT_TUPLES`).
+        weights (np.ndarray, optional): Wczytane wagi (np. z `AIPlayer.load_model`).
+        alpha (float): Patrz atrybut `alpha`.
+
+    Raises:
+        ValueError: Jeśli rozmiar `weights` nie pasuje do krotek.
+    """
+    def __init__(self, tuples=None, weights=None, alpha=0.0025):
+        self.tuples = [tuple(t) for t in (tuples or DEFAULT_TUPLES)]
+        self.alpha = alpha
+
+        sizes = [CELL_VALUES ** len(t) for t in self.tuples]
+        offsets = np.cumsum([0] + sizes[:-1])
+        if weights is None:
+            weights = np.zeros(sum(sizes), dtype=np.float32)
+        elif len(weights) != sum(sizes):
+            raise ValueError("Błąd rozmiaru wag sieci n-krotek")
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+
+        # Każda (krotka, symetria) to jeden odczyt; krotki są grupowane wg długości,
+        # żeby indeksy liczyć jednym mnożeniem macierzy na grupę.
+        self._groups = []
+        for length in sorted({len(t) for t in self.tuples}):
+            cells, bases = [], []
+            for t, offset in zip(self.tuples, offsets):
+                if len(t) != length:
+                    continue
+                for perm in _symmetric_cells():
+                    cells.append(perm[list(t)])
+                    bases.append(offset)
+            powers = CELL_VALUES ** np.arange(length - 1, -1, -1, dtype=np.int64)
+            self._groups.append((np.array(cells), powers, np.array(bases, dtype=np.int64)))
+        self.lookups = sum(len(bases) for _, _, bases in self._groups)
+
+    def indices(self, board):
+        """
+        Zwraca indeksy wag odczytywanych dla planszy (cechy sieci).
+
+        Args:
+            board (np.ndarray): Plansza 4x4 (wykładniki).
+
+        Returns:
+            np.ndarray: Wektor `lookups` indeksów do `weights` (int64).
+        """
+        flat = board.ravel().astype(np.int64)
+        return np.concatenate([flat[cells] @ powers + bases for cells, powers, bases in self._groups])
+
+    def indices_many(self, boards):
+        """
+        Wsadowa wersja `indices`.
+
+        Args:
+            boards (np.ndarray): Plansze (N, 4, 4) jako wykładniki.
+
+        Returns:
+            np.ndarray: Macierz indeksów (N, lookups).
+        """
+        flat = boards.reshape(len(boards), 16).astype(np.int64)
+        return np.concatenate([flat[:, cells] @ powers + bases for cells, powers, bases in self._groups],
+                              axis=1)
+
+    def value(self, board):
+        """
+        Wartość planszy.
+
+        Args:
+            board (np.ndarray): Plansza 4x4 (wykładniki).
+
+        Returns:
+            float: Suma wag wszystkich odczytów.
+        """
+        return float(self.weights[self.indices(board)].sum())
+
+    def value_many(self, boards):
+        """
+        Wartości stosu plansz.
+
+        Args:
+            boards (np.ndarray): Plansze (N, 4, 4) jako wykładniki.
+
+        Returns:
+            np.ndarray: Wektor N wartości (float64).
+        """
+        return self.weights[self.indices_many(boards)].sum(axis=1, dtype=np.float64)
+
+    def update(self, indices, td_error):
+        """
+        Aktualizacja TD: dodaje `alpha * td_error` do każdej odczytanej wagi.
+
+        Powtórzone indeksy (plansze symetryczne) są aktualizowane wielokrotnie.
+
+        Args:
+            indices (np.ndarray): Indeksy z `indices` dla aktualizowanego stanu.
+            td_error (float): Błąd predykcji czasowej.
+        """
+        np.add.at(self.weights, indices, np.float32(self.alpha * td_error))
+
+    def update_many(self, indices, td_errors):
+        """
+        Zsumowana aktualizacja TD dla partii stanów.
+
+        Args:
+            indices (np.ndarray): Macierz indeksów (B, lookups) z `indices_many`.
+            td_errors (np.ndarray): Błędy TD (B,).
+        """
+        steps = (self.alpha * np.asarray(td_errors)).astype(np.float32)
+        np.add.at(self.weights, indices.ravel(), np.repeat(steps, indices.shape[1]))
+
+    def bounds(self):
+        """
+        Zwraca przedział wartości możliwych przy bieżących wagach.
+
+        Returns:
+            tuple: (suma minimów, suma maksimów) po wszystkich odczytach.
+        """
+        low = high = 0.0
+        for start, end in self._ranges():
+            table = self.weights[start:end]
+            low += 8 * float(table.min())
+            high += 8 * float(table.max())
+        return low, high
+
+    def _ranges(self):
+        """Zwraca przedziały [początek, koniec) tablic kolejnych krotek w `weights`."""
+        start = 0
+        for t in self.tuples:
+            end = start + CELL_VALUES ** len(t)
+            yield start, end
+            start = end
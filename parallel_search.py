@@ -0,0 +1,233 @@
+"""
+Moduł z równoległą oceną ruchów korzenia Expectimax na stałej puli procesów.
+"""
+import os
+import time
+import concurrent.futures
+from multiprocessing import shared_memory
+import numpy as np
+from game_2048 import Game2048
+from game_bitboard import exponents_to_bitboard, bitboard_to_exponents
+
+_worker_searcher = None
+_worker_version = None
+_worker_memory = []
+
+
+def _share_array(array, memory):
+    """Kopiuje tablicę do nowego bloku pamięci współdzielonej (blok trafia do `memory`)."""
+    block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    memory.append(block)
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[:] = array
+    return shared
+
+
+def _attach_array(name, shape, dtype):
+    """Dołącza się do bloku pamięci współdzielonej i zwraca oparty na nim widok tablicy."""
+    block = shared_memory.SharedMemory(name=name)
+    _worker_memory.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(linear_name, ntuple_spec, evaluator, max_depth, min_probability):
+    """
+    Inicjalizuje proces roboczy: tworzy gracza z wagami i własny `ExpectimaxSearch`.
+
+    Wykonywane raz na proces. Wagi leżą w pamięci współdzielonej, więc
+    kolejne zadania przesyłają już tylko planszę i numer wersji wag.
+    """
+    global _worker_searcher
+    from ai_player import AIPlayer
+    from expectimax import ExpectimaxSearch
+    from ntuple import NTupleNetwork
+
+    weights = _attach_array(linear_name, (2, 6), np.float64)
+    ai = AIPlayer()
+    ai.weights_normal = weights[0]
+    ai.weights_panic = weights[1]
+    if ntuple_spec is not None:
+        name, tuples, size = ntuple_spec
+        ai.ntuple = NTupleNetwork(tuples, weights=_attach_array(name, (size,), np.float32))
+    ai.evaluator = evaluator
+    _worker_searcher = ExpectimaxSearch(ai, max_depth=max_depth, time_limit=None,
+                                        min_probability=min_probability)
+
+
+def _ping(_):
+    """Puste zadanie rozgrzewające (wymusza start procesu i inicjalizację)."""
+    return os.getpid()
+
+
+def _afterstate_value(bb, depth, time_limit, max_nodes, weights_version):
+    """
+    Zadanie robocze: ocenia poddrzewo jednej planszy po ruchu.
+
+    Args:
+        bb (int): Plansza po ruchu spakowana do 64 bitów.
+        depth (int): Głębokość przeszukiwania.
+        time_limit (float | None): Czas na obliczenie w sekundach.
+        max_nodes (int | None): Limit odwiedzonych węzłów.
+        weights_version (int): `weights_version` gracza; po zmianie wagi we
+            wspólnej pamięci są już nowe, a proces czyści swój cache.
+
+    Returns:
+        tuple: (wartość lub None przy przekroczeniu limitu, liczba_węzłów)
+    """
+    global _worker_version
+    if weights_version != _worker_version:
+        _worker_searcher.ai._weights_changed()
+        _worker_version = weights_version
+    value = _worker_searcher.afterstate_value(bitboard_to_exponents(bb), depth, time_limit, max_nodes)
+    return value, _worker_searcher.nodes
+
+
+class ParallelExpectimaxSearch:
+    """
+    Expectimax z poddrzewami ruchów korzenia liczonymi równolegle w procesach roboczych.
+
+    Pula procesów jest trwała: każdy proces ma rozgrzany cache, a zadanie
+    przesyła tylko spakowaną planszę (int). Wagi leżą w pamięci współdzielonej
+    (jak w treningu Hogwild): po zmianie wag gracza (`weights_version`) wagi
+    liniowe są kopiowane do wspólnego bloku, a tablica sieci n-krotek gracza
+    jest na czas życia puli zastąpiona widokiem tego bloku, więc aktualizacje
+    w miejscu nie wymagają kopiowania. Pula jest odtwarzana tylko po podmianie
+    sieci n-krotek lub zmianie `evaluator`.
+    Interfejs `search` jest taki sam jak w `ExpectimaxSearch`.
+
+    Attributes:
+        ai (AIPlayer): Gracz dostarczający wagi.
+        workers (int): Liczba procesów roboczych.
+        max_depth (int): Maksymalna liczba ruchów gracza w głąb.
+        time_limit (float | None): Czas na ruch w sekundach (None = bez limitu).
+        max_nodes (int | None): Limit odwiedzonych węzłów na ruch (None = bez limitu).
+        min_probability (float): Próg skumulowanego prawdopodobieństwa gałęzi.
+
+    Args:
+        ai (AIPlayer): Gracz z wagami heurystyki.
+        workers (int, optional): Liczba procesów (domyślnie liczba rdzeni).
+        max_depth (int): Patrz atrybut `max_depth`.
+        time_limit (float | None): Patrz atrybut `time_limit`.
+        min_probability (float): Patrz atrybut `min_probability`.
+        max_nodes (int | None): Patrz atrybut `max_nodes`.
+    """
+    def __init__(self, ai, workers=None, max_depth=3, time_limit=0.1, min_probability=1e-4,
+                 max_nodes=None):
+        self.ai = ai
+        self.workers = workers or os.cpu_count()
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.min_probability = min_probability
+        self.sim = Game2048()
+        self._pool = None
+        self._pool_version = None
+        self._pool_config = None
+        self._memory = []
+        self._linear = None
+        self._shared_ntuple = None
+
+    def _ensure_pool(self):
+        """Tworzy rozgrzaną pulę procesów i przekazuje jej bieżące wagi gracza."""
+        ntuple = self.ai.ntuple
+        if self._pool is not None and self._pool_config != (ntuple, self.ai.evaluator):
+            self.close()
+        if self._pool is None:
+            self._linear = _share_array(np.array([self.ai.weights_normal, self.ai.weights_panic],
+                                                 dtype=np.float64), self._memory)
+            ntuple_spec = None
+            if ntuple is not None:
+                self._shared_ntuple = _share_array(ntuple.weights, self._memory)
+                ntuple.weights = self._shared_ntuple
+                ntuple_spec = (self._memory[-1].name, ntuple.tuples, len(ntuple.weights))
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self._memory[0].name, ntuple_spec, self.ai.evaluator,
+                          self.max_depth, self.min_probability))
+            list(self._pool.map(_ping, range(self.workers)))
+            self._pool_config = (ntuple, self.ai.evaluator)
+            self._pool_version = self.ai.weights_version
+            return
+
+        if self._pool_version != self.ai.weights_version:
+            self._linear[0] = self.ai.weights_normal
+            self._linear[1] = self.ai.weights_panic
+            if ntuple is not None and ntuple.weights is not self._shared_ntuple:
+                self._shared_ntuple[:] = ntuple.weights
+                ntuple.weights = self._shared_ntuple
+            self._pool_version = self.ai.weights_version
+
+    def close(self):
+        """Zamyka pulę procesów i oddaje sieci n-krotek zwykłą (prywatną) tablicę wag."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._pool_config is not None and self._pool_config[0] is not None:
+            ntuple = self._pool_config[0]
+            if ntuple.weights is self._shared_ntuple:
+                ntuple.weights = np.array(ntuple.weights)
+        self._pool_config = None
+        self._linear = None
+        self._shared_ntuple = None
+        for block in self._memory:
+            block.close()
+            block.unlink()
+        self._memory = []
+
+    def search(self, board):
+        """
+        Wybiera ruch, rozsyłając poddrzewa ruchów korzenia do procesów roboczych.
+
+        Args:
+            board (np.ndarray): Plansza gry (wykładniki).
+
+        Returns:
+            tuple: (ruch, statystyki) - jak w `ExpectimaxSearch.search`.
+        """
+        start = time.perf_counter()
+        self._ensure_pool()
+
+        self.sim.load_state(board)
+        valid_moves = self.sim.get_valid_moves()
+        afterstates = []
+        for move in valid_moves:
+            self.sim.push_move(move)
+            afterstates.append(exponents_to_bitboard(self.sim.exponents))
+            self.sim.pop_state()
+
+        nodes = 0
+        best_move, best_value, reached = None, None, 0
+        for depth in range(1, self.max_depth + 1) if valid_moves else ():
+            time_limit = None
+            node_limit = None
+            if depth > 1:
+                if self.time_limit is not None:
+                    time_limit = self.time_limit - (time.perf_counter() - start)
+                    if time_limit <= 0:
+                        break
+                if self.max_nodes is not None:
+                    node_limit = (self.max_nodes - nodes) // len(afterstates)
+                    if node_limit <= 0:
+                        break
+
+            futures = [self._pool.submit(_afterstate_value, bb, depth, time_limit, node_limit,
+                                         self._pool_version)
+                       for bb in afterstates]
+            results = [f.result() for f in futures]
+            nodes += sum(n for _, n in results)
+            values = [v for v, _ in results]
+            if None in values:
+                break
+
+            best_value = max(values)
+            best_move = valid_moves[values.index(best_value)]
+            reached = depth
+
+        stats = {
+            'nodes': nodes,
+            'depth': reached,
+            'time': time.perf_counter() - start,
+            'value': best_value,
+        }
+        return best_move, stats
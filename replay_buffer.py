@@ -0,0 +1,75 @@
+"""
+Moduł z buforem doświadczeń (experience replay) o stałym rozmiarze pamięci.
+"""
+import numpy as np
+
+TRANSITION_BYTES = 2 * 16 + 4 + 1
+
+
+class ReplayBuffer:
+    """
+    Bufor przejść w prealokowanych tablicach numpy nadpisywanych cyklicznie (ring).
+
+    Przejście to plansza, nagroda (ukształtowana), plansza następna i flaga
+    końca gry. Plansze są zapisywane jako wykładniki uint8 (16 bajtów), więc
+    przejście zajmuje `TRANSITION_BYTES` bajtów, a limit pamięci jest
+    przeliczany na liczbę przejść. Po zapełnieniu najstarsze przejścia są
+    nadpisywane.
+
+    Attributes:
+        capacity (int): Maksymalna liczba przechowywanych przejść.
+        boards (np.ndarray): Plansze `(capacity,4,4)` (uint8).
+        rewards (np.ndarray): Nagrody `(capacity,)` (float32).
+        next_boards (np.ndarray): Plansze następne `(capacity,4,4)` (uint8).
+        dones (np.ndarray): Flagi końca gry `(capacity,)`.
+
+    Args:
+        max_mb (float): Limit pamięci w MB.
+    """
+    def __init__(self, max_mb=64):
+        self.capacity = max(1, int(max_mb * 1024 * 1024 / TRANSITION_BYTES))
+        self.boards = np.zeros((self.capacity, 4, 4), dtype=np.uint8)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_boards = np.zeros((self.capacity, 4, 4), dtype=np.uint8)
+        self.dones = np.zeros(self.capacity, dtype=bool)
+        self._pos = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, board, reward, next_board, done):
+        """
+        Zapisuje przejście, nadpisując najstarsze po zapełnieniu bufora.
+
+        Args:
+            board (np.ndarray): Plansza 4x4 (wykładniki).
+            reward (float): Nagroda za przejście.
+            next_board (np.ndarray): Plansza następna (dowolna, gdy `done`).
+            done (bool): Czy przejście kończy grę.
+        """
+        self.boards[self._pos] = board
+        self.rewards[self._pos] = reward
+        self.next_boards[self._pos] = next_board
+        self.dones[self._pos] = done
+        self._pos = (self._pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def sample(self, batch_size, rng):
+        """
+        Losuje partię przejść (ze zwracaniem).
+
+        Args:
+            batch_size (int): Liczba przejść.
+            rng (np.random.Generator): Generator losowania.
+
+        Returns:
+            tuple: (plansze, nagrody, plansze_następne, flagi_końca) - kopie tablic.
+
+        Raises:
+            ValueError: Jeśli bufor jest pusty.
+        """
+        if self._size == 0:
+            raise ValueError("Błąd: pusty bufor doświadczeń")
+        idx = rng.integers(0, self._size, size=batch_size)
+        return self.boards[idx], self.rewards[idx], self.next_boards[idx], self.dones[idx]
@@ -1,17 +1,35 @@
-from game_2048 import Game2048
+from game_2048 import Game2048, BatchGame2048
 from ai_player import AIPlayer
+from game_bitboard import UniformBuffer
+from ntuple import NTupleNetwork
+from replay_buffer import ReplayBuffer
+from checkpoint import CheckpointWriter
 import numpy as np
 import math
 import random
 import time
 import os
 import csv
+import concurrent.futures
+from multiprocessing import shared_memory
 
 ALPHA_START = 0.001
 ALPHA_END = 0.0001
 GAMMA = 0.99
+LAMBDA = 0.0
 EPISODES = 5000
 LOG_FILE = "training_history.csv"
+CHECKPOINT_FILE = "ai_2048_save.npz"
+LEGACY_CHECKPOINT_FILE = "ai_2048_save.pkl"
+KEEP_CHECKPOINTS = 3
+SEED = None
+USE_NTUPLE = False
+TRAINING_MODE = 'state'
+WORKERS = 1
+LOCKSTEP_GAMES = 0
+REPLAY_MB = 0
+REPLAY_BATCH = 32
+REPLAY_EVERY = 4
 
 def get_shaped_reward(game_reward, board):
     """
@@ -22,7 +40,7 @@ def get_shaped_reward(game_reward, board):
 
     Args:
         game_reward (int): Punkty zdobyte w ruchu (z silnika gry).
-        board (np.ndarray): Stan planszy po ruchu.
+        board (np.ndarray): Stan planszy po ruchu (wykładniki).
 
     Returns:
         float: Zmodyfikowana wartość nagrody.
@@ -39,6 +57,18 @@ def get_shaped_reward(game_reward, board):
     return reward
 
 
+def get_shaped_rewards(game_rewards):
+    """
+    Wsadowa wersja `get_shaped_reward` dla tablicy nagród.
+
+    Args:
+        game_rewards (np.ndarray): Punkty zdobyte w ruchach.
+
+    Returns:
+        np.ndarray: Nagrody ukształtowane (float).
+    """
+    return np.where(game_rewards > 0, np.log2(np.maximum(game_rewards, 1)) + 1.0, 0.0)
+
 def save_logs_to_csv(buffer, filename):
     """
     Zapisuje bufor logów treningowych do pliku CSV.
@@ -63,93 +93,201 @@ def save_logs_to_csv(buffer, filename):
         writer.writerows(buffer)
         print(f"--> Zapisano {len(buffer)} wpisów.")
 
-def train():
+def play_afterstate_episode(ai, game):
     """
-    Główna pętla treningowa AI.
-    
-    Proces:
-    1. Inicjalizacja gry i AI (ładowanie checkpointu).
-    2. Pętla po epizodach (grach).
-    3. Wybór ruchu (1-step Lookahead).
-    4. Aktualizacja wag (TD-Learning).
-    5. Logowanie wyników i zapisywanie modelu.
+    Rozgrywa jeden epizod z uczeniem na stanach po ruchu (afterstate TD).
+
+    Ruch wybierany jest zachłannie: max(nagroda + wartość planszy po ruchu).
+    Wartość i cechy wybranej planszy po ruchu, policzone już przy wyborze
+    (`AIPlayer.evaluate_afterstates`), trafiają wprost do `update_weights`
+    w następnym kroku - trening nie wykonuje żadnych dodatkowych ocen.
+
+    Args:
+        ai (AIPlayer): Uczony gracz.
+        game (Game2048): Nowa gra (po `reset`).
+
+    Returns:
+        int: Liczba wykonanych ruchów.
     """
-    ai = AIPlayer()
-    scores_history = []
-    max_tiles_history = []
-    csv_buffer = []
+    prev_features, prev_value = None, None
+    moves_count = 0
+    done = False
 
+    while not done:
+        moves, rewards, values, features = ai.evaluate_afterstates(game.exponents)
+        if not moves:
+            break
 
-    CHECKPOINT_FILE = "ai_2048_save.pkl"
-    start_episode = ai.load_model(CHECKPOINT_FILE)
+        shaped = [get_shaped_reward(r, None) for r in rewards]
+        best = max(range(len(moves)), key=lambda i: shaped[i] + values[i])
 
-    if start_episode > 0:
-        print(f"Wznowiono trening od epizodu: {start_episode}")
-    else:
-        print("Rozpoczynam nowy trening...")
+        if prev_features is not None:
+            target = shaped[best] + GAMMA * values[best]
+            ai.update_weights(prev_features, target - prev_value)
 
-    start_time = time.time()
+        prev_features, prev_value = features[best], values[best]
+        _, _, done, _ = game.move(moves[best])
+        moves_count += 1
 
-    current_episode = start_episode
-    target_episode = start_episode + EPISODES
+    if prev_features is not None:
+        ai.update_weights(prev_features, -30.0 - prev_value)
+    return moves_count
 
-    while current_episode < target_episode:
-        game = Game2048()
-        state = game.board.copy()
-        done = False
 
-        game_start_time = time.time()
-        moves_count = 0
+def lambda_td_errors(deltas, decay, chunk=64):
+    """
+    Zamienia jednokrokowe błędy TD na błędy względem λ-zwrotów (wstecz, wektorowo).
 
-   
-        if current_episode < 2000:
-            progress = current_episode / 2000
-            base_alpha = ALPHA_START - ((ALPHA_START - ALPHA_END) * progress)
-        else:
-            base_alpha = ALPHA_END
+    Błąd stanu t to suma `decay^(k-t) * deltas[k]` po k >= t. Suma jest liczona
+    skumulowaną sumą po odwróconych blokach `chunk` elementów (potęgi `decay`
+    w obrębie bloku nie tracą precyzji), a wynik bloku przenoszony jest do
+    bloku wcześniejszego. Dla małego `decay` blok jest skracany tak, by
+    `decay^(chunk-1)` nie spadło poniżej 1e-100 (bez niedomiaru przy dzieleniu);
+    w skrajnym przypadku (blok 1) to zwykła rekurencja wsteczna.
 
-      
-        current_avg_score = 0
-        if len(scores_history) > 0:
-            current_avg_score = sum(scores_history) / len(scores_history)
+    Args:
+        deltas (np.ndarray): Jednokrokowe błędy TD epizodu.
+        decay (float): Iloczyn `GAMMA * LAMBDA` (z przedziału [0, 1]).
+        chunk (int): Maksymalna długość bloku.
 
-        ai.alpha = 0.00005
-        epsilon = 0 
+    Returns:
+        np.ndarray: Błędy TD(λ) dla kolejnych stanów.
+    """
+    if decay <= 0:
+        chunk = 1
+    elif decay < 1:
+        chunk = max(1, min(chunk, 1 + int(100 / -math.log10(decay))))
+    errors = np.empty(len(deltas))
+    carry = 0.0
+    for end in range(len(deltas), 0, -chunk):
+        start = max(0, end - chunk)
+        block = deltas[start:end]
+        powers = decay ** np.arange(len(block))
+        errors[start:end] = np.cumsum((block * powers)[::-1])[::-1] / powers + \
+            carry * decay ** np.arange(len(block), 0, -1)
+        carry = errors[start]
+    return errors
+
+
+def lambda_update(ai, boards, rewards, final_board, done):
+    """
+    Aktualizacja TD(λ) po zakończeniu epizodu.
+
+    Wartości i cechy całej trajektorii liczone są jednym wywołaniem
+    `evaluate_with_features_many`, błędy λ-zwrotów - jednym przebiegiem
+    wstecz (`lambda_td_errors`), a wagi obu faz (NORMAL/PANIC) zmieniane
+    są zbiorczo przez `update_weights_many`.
+
+    Args:
+        ai (AIPlayer): Uczony gracz.
+        boards (list): Plansze stanów, z których wykonano ruchy.
+        rewards (list): Nagrody ukształtowane za te ruchy.
+        final_board (np.ndarray): Plansza po ostatnim ruchu.
+        done (bool): Czy epizod zakończył się końcem gry (kara -30).
+    """
+    values, features = ai.evaluate_with_features_many(np.array(boards + [final_board]))
+    next_values = GAMMA * values[1:]
+    if done:
+        next_values[-1] = -30.0
+    deltas = np.array(rewards) + next_values - values[:-1]
+    ai.update_weights_many(features[:-1], lambda_td_errors(deltas, GAMMA * LAMBDA))
+
+
+def replay_update(ai, replay, rng):
+    """
+    Aktualizacja TD(0) na mini-partii przejść wylosowanych z bufora doświadczeń.
+
+    Cechy i wartości całej partii liczone są wsadowo, a błędy TD trafiają
+    do jednej zsumowanej aktualizacji `update_weights_many`. Cel jest taki
+    sam jak w pętli `play_episode`.
+
+    Args:
+        ai (AIPlayer): Uczony gracz.
+        replay (ReplayBuffer): Bufor przejść.
+        rng (np.random.Generator): Generator losowania partii.
+    """
+    boards, rewards, next_boards, dones = replay.sample(REPLAY_BATCH, rng)
+    values, features = ai.evaluate_with_features_many(boards)
+    next_values = ai.evaluate_many(next_boards)
+    targets = np.where(dones, rewards - 30.0, rewards + GAMMA * next_values)
+    ai.update_weights_many(features, targets - values)
+
+
+def play_episode(ai, episode, seed_seq, replay=None):
+    """
+    Rozgrywa jeden epizod treningowy i uczy na nim gracza (TD-Learning).
+
+    Używana zarówno w pętli jednoprocesowej, jak i w procesach roboczych
+    `play_episodes_parallel`.
+
+    Args:
+        ai (AIPlayer): Uczony gracz.
+        episode (int): Numer epizodu (liczony od 0).
+        seed_seq (np.random.SeedSequence): Ziarno treningu.
+        replay (ReplayBuffer, optional): Bufor doświadczeń; przejścia z trybu
+            'state' (przy TD(0)) są do niego zapisywane, a co `REPLAY_EVERY`
+            ruchów wykonywana jest aktualizacja `replay_update`.
+
+    Returns:
+        tuple: (wynik, największy_klocek, liczba_ruchów, czas_gry_s, końcowa_plansza)
+    """
+    # Strumień zależy tylko od ziarna i numeru epizodu, więc jest odtwarzalny także po wznowieniu.
+    episode_seed = np.random.SeedSequence(seed_seq.entropy, spawn_key=(episode,))
+    game_seed, ai_seed = episode_seed.spawn(2)
+    ai.rng = UniformBuffer(ai_seed)
+
+    game = Game2048(seed=game_seed)
+    state = game.exponents.copy()
+    done = False
+
+    game_start_time = time.time()
+    moves_count = 0
+
+   
+    if episode < 2000:
+        progress = episode / 2000
+        base_alpha = ALPHA_START - ((ALPHA_START - ALPHA_END) * progress)
+    else:
+        base_alpha = ALPHA_END
 
+  
+    ai.alpha = 0.00005
+    epsilon = 0 
 
-     
 
-        sim_game = Game2048(game.size) 
+ 
 
+
+    if TRAINING_MODE == 'afterstate':
+        moves_count = play_afterstate_episode(ai, game)
+    else:
+        # Przy LAMBDA > 0 trajektoria jest buforowana, a wagi zmieniane dopiero na końcu epizodu.
+        trajectory, trajectory_rewards = [], []
         while not done:
             valid_moves = game.get_valid_moves()
             if not valid_moves:
                 break
 
-        
+    
             if random.random() < epsilon:
                 best_move = random.choice(valid_moves)
             else:
-                best_move, best_v = None, -float('inf')
-
-                for move in valid_moves:
-                    sim_game.board = state
-                    next_s_sim, _, _ = sim_game.move_without_random(move)
+                best_move = ai.choose_move(state)
 
-                    v = ai.get_expected_value(next_s_sim)
-
-                    if v > best_v:
-                        best_v = v
-                        best_move = move
-
-        
+    
             next_state_real, raw_reward, done, _ = game.move(best_move)
             moves_count += 1
 
             reward_shaped = get_shaped_reward(raw_reward, next_state_real)
+            if LAMBDA > 0:
+                trajectory.append(state)
+                trajectory_rewards.append(reward_shaped)
+                state = next_state_real.copy()
+                continue
+
             features_state = ai.get_features(state)
             current_v = ai.evaluate(state)
-          
+      
 
             if done:
                 target = reward_shaped - 30.0
@@ -159,19 +297,283 @@ def train():
 
             td_error = target - current_v
 
-          
+      
             ai.update_weights(features_state, td_error)
 
+            if replay is not None:
+                replay.add(state, reward_shaped, next_state_real, done)
+                if moves_count % REPLAY_EVERY == 0:
+                    replay_update(ai, replay, ai.rng.rng)
+
             state = next_state_real.copy()
 
+        if trajectory:
+            lambda_update(ai, trajectory, trajectory_rewards, state, done)
+
+    game_duration = time.time() - game_start_time
+    return game.score, np.max(game.board), moves_count, game_duration, game.board
+
+
+_worker_ai = None
+_worker_memory = []
+
+
+def _share_array(array, memory):
+    """
+    Kopiuje tablicę do nowego bloku pamięci współdzielonej.
+
+    Args:
+        array (np.ndarray): Tablica do skopiowania.
+        memory (list): Lista, do której trafia utworzony blok (do zamknięcia).
+
+    Returns:
+        np.ndarray: Tablica oparta na pamięci współdzielonej.
+    """
+    block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    memory.append(block)
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[:] = array
+    return shared
+
+
+def _attach_array(name, shape, dtype):
+    """Dołącza się do bloku pamięci współdzielonej i zwraca oparty na nim widok tablicy."""
+    block = shared_memory.SharedMemory(name=name)
+    _worker_memory.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(linear_name, ntuple_spec, config):
+    """
+    Inicjalizuje proces roboczy: gracz z wagami w pamięci współdzielonej.
+
+    Wykonywane raz na proces. `update_weights` zmienia wagi w miejscu,
+    więc każda aktualizacja jest od razu widoczna dla pozostałych procesów.
+    Parametry modułu są ustawiane z `config` (`training_config` procesu
+    głównego) - przy starcie 'spawn' proces miałby wartości domyślne.
+    """
+    global _worker_ai, TRAINING_MODE, GAMMA, LAMBDA, USE_NTUPLE, ALPHA_START, ALPHA_END
+    TRAINING_MODE = config['training_mode']
+    GAMMA = config['gamma']
+    LAMBDA = config['lambda']
+    USE_NTUPLE = config['use_ntuple']
+    ALPHA_START = config['alpha_start']
+    ALPHA_END = config['alpha_end']
+
+    weights = _attach_array(linear_name, (2, 6), np.float64)
+    _worker_ai = AIPlayer()
+    _worker_ai.weights_normal = weights[0]
+    _worker_ai.weights_panic = weights[1]
+    if ntuple_spec is not None:
+        name, tuples, size, alpha = ntuple_spec
+        _worker_ai.ntuple = NTupleNetwork(tuples, weights=_attach_array(name, (size,), np.float32),
+                                          alpha=alpha)
+
+
+def _play_episode_task(episode, seed_seq):
+    """Zadanie robocze: jeden epizod `play_episode` na wagach współdzielonych."""
+    return play_episode(_worker_ai, episode, seed_seq)
+
+
+def play_episodes_parallel(ai, seed_seq, start_episode, target_episode, workers):
+    """
+    Trening Hogwild: epizody grane równolegle na wspólnych wagach bez blokad.
+
+    Wagi gracza (12 liczb modelu liniowego i ewentualnie tablica sieci
+    n-krotek) są przenoszone do `multiprocessing.shared_memory`. Procesy
+    robocze grają kolejne epizody i stosują swoje aktualizacje TD wprost
+    do tych wag; proces główny czyta je przy logowaniu i zapisie checkpointu.
+    Po zakończeniu wagi wracają do zwykłych tablic gracza.
+
+    Ewaluator 'lut' i cache ocen (`set_cache`) nie widzą zmian z innych
+    procesów, więc procesy robocze używają domyślnego ewaluatora bez cache.
+
+    Args:
+        ai (AIPlayer): Uczony gracz (jego wagi są współdzielone).
+        seed_seq (np.random.SeedSequence): Ziarno treningu.
+        start_episode (int): Pierwszy numer epizodu.
+        target_episode (int): Numer epizodu, na którym trening się kończy.
+        workers (int): Liczba procesów roboczych.
+
+    Yields:
+        tuple: Wyniki epizodów jak z `play_episode`, w kolejności numerów.
+    """
+    memory = []
+    pool = None
+    try:
+        weights = _share_array(np.array([ai.weights_normal, ai.weights_panic], dtype=np.float64), memory)
+        ai.weights_normal = weights[0]
+        ai.weights_panic = weights[1]
+        ntuple_spec = None
+        if ai.ntuple is not None:
+            ai.ntuple.weights = _share_array(ai.ntuple.weights, memory)
+            ntuple_spec = (memory[-1].name, ai.ntuple.tuples, len(ai.ntuple.weights), ai.ntuple.alpha)
+
+        pool = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_init_worker,
+            initargs=(memory[0].name, ntuple_spec, training_config(seed_seq)))
+        episodes = range(start_episode, target_episode)
+        yield from pool.map(_play_episode_task, episodes, [seed_seq] * len(episodes))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        ai.weights_normal = np.array(ai.weights_normal)
+        ai.weights_panic = np.array(ai.weights_panic)
+        if ai.ntuple is not None:
+            ai.ntuple.weights = np.array(ai.ntuple.weights)
+        for block in memory:
+            block.close()
+            block.unlink()
+
+
+def play_episodes_lockstep(ai, seed_seq, start_episode, target_episode, n_games):
+    """
+    Trening na N grach prowadzonych równolegle krokami (lockstep) w `BatchGame2048`.
+
+    W każdym kroku plansze po ruchu wszystkich gier i kierunków oceniane są
+    jednym wywołaniem `evaluate_with_features_many`; każda gra wybiera ruch
+    zachłannie (jak `play_afterstate_episode`), a błędy TD całej partii
+    trafiają do jednej zsumowanej aktualizacji `update_weights_many`.
+    Zakończone gry są od razu zastępowane nowymi. Gry trwające w chwili
+    osiągnięcia `target_episode` są porzucane.
+
+    Args:
+        ai (AIPlayer): Uczony gracz.
+        seed_seq (np.random.SeedSequence): Ziarno treningu.
+        start_episode (int): Pierwszy numer epizodu.
+        target_episode (int): Numer epizodu, na którym trening się kończy.
+        n_games (int): Liczba gier prowadzonych jednocześnie.
+
+    Yields:
+        tuple: Wyniki epizodów jak z `play_episode`, w kolejności ich zakończenia
+            (czas gry to jej udział w czasie kroków partii).
+    """
+    ai.alpha = 0.00005
+    # Strumień zależy tylko od ziarna i epizodu startowego, więc wznowienie jest odtwarzalne.
+    batch = BatchGame2048(n_games, seed=np.random.SeedSequence(seed_seq.entropy, spawn_key=(start_episode,)))
+    rows = np.arange(n_games)
+    moves_count = np.zeros(n_games, dtype=np.int64)
+    durations = np.zeros(n_games)
+    prev_features, prev_values = None, None
+    has_prev = np.zeros(n_games, dtype=bool)
+    remaining = target_episode - start_episode
+
+    while remaining > 0:
+        step_start = time.time()
+        afterstates, rewards = batch.afterstates()
+        values, features = ai.evaluate_with_features_many(afterstates.reshape(-1, 4, 4))
+        values = values.reshape(n_games, 4)
+        features = features.reshape(n_games, 4, -1)
+
+        shaped = get_shaped_rewards(rewards)
+        best = np.where(batch.legal, shaped + values, -np.inf).argmax(axis=1)
+        best_values = values[rows, best]
+
+        update_features, update_errors = [], []
+        if has_prev.any():
+            update_features.append(prev_features[has_prev])
+            update_errors.append(shaped[rows, best][has_prev] + GAMMA * best_values[has_prev] -
+                                 prev_values[has_prev])
+        prev_features, prev_values = features[rows, best], best_values
+
+        _, _, done = batch.step(best)
+        moves_count += 1
+        durations += (time.time() - step_start) / n_games
+
+        update_features.append(prev_features[done])
+        update_errors.append(-30.0 - prev_values[done])
+        has_prev = ~done
+        ai.update_weights_many(np.concatenate(update_features), np.concatenate(update_errors))
+
+        for i in np.flatnonzero(done)[:remaining]:
+            final_board = batch.final_boards[i]
+            yield batch.final_scores[i], final_board.max(), moves_count[i], durations[i], final_board
+        remaining -= done.sum()
+        moves_count[done] = 0
+        durations[done] = 0.0
+
+
+def training_config(seed_seq):
+    """
+    Zwraca konfigurację treningu zapisywaną w checkpoincie.
+
+    Args:
+        seed_seq (np.random.SeedSequence): Ziarno treningu (jego entropia
+            pozwala wznowić trening z tymi samymi strumieniami losowymi).
+
+    Returns:
+        dict: Parametry treningu (serializowalne do JSON).
+    """
+    return {
+        'seed_entropy': seed_seq.entropy,
+        'alpha_start': ALPHA_START,
+        'alpha_end': ALPHA_END,
+        'gamma': GAMMA,
+        'lambda': LAMBDA,
+        'training_mode': TRAINING_MODE,
+        'use_ntuple': USE_NTUPLE,
+        'workers': WORKERS,
+        'lockstep_games': LOCKSTEP_GAMES,
+        'replay_mb': REPLAY_MB,
+        'replay_batch': REPLAY_BATCH,
+        'replay_every': REPLAY_EVERY,
+    }
+
+
+def train():
+    """
+    Główna pętla treningowa AI.
+    
+    Proces:
+    1. Inicjalizacja gry i AI (ładowanie checkpointu).
+    2. Pętla po epizodach (grach).
+    3. Wybór ruchu (1-step Lookahead).
+    4. Aktualizacja wag (TD-Learning).
+    5. Logowanie wyników i zapisywanie modelu.
+    """
+    ai = AIPlayer()
+    scores_history = []
+    max_tiles_history = []
+    csv_buffer = []
+
+
+    start_episode = ai.load_model(CHECKPOINT_FILE) or ai.load_model(LEGACY_CHECKPOINT_FILE)
+    writer = CheckpointWriter(KEEP_CHECKPOINTS)
+
+    if start_episode > 0:
+        print(f"Wznowiono trening od epizodu: {start_episode}")
+    else:
+        print("Rozpoczynam nowy trening...")
+
+    if USE_NTUPLE and ai.ntuple is None:
+        ai.ntuple = NTupleNetwork()
+        print("Funkcja wartości: sieć n-krotek")
+
+    # Bez jawnego ziarna wznowiony trening kontynuuje strumienie zapisane w checkpoincie.
+    seed_seq = np.random.SeedSequence(SEED if SEED is not None else ai.checkpoint_config.get('seed_entropy'))
+    print(f"Ziarno treningu: {seed_seq.entropy}")
+
+    start_time = time.time()
+
+    current_episode = start_episode
+    target_episode = start_episode + EPISODES
+
+    replay = ReplayBuffer(REPLAY_MB) if REPLAY_MB else None
+
+    if LOCKSTEP_GAMES > 1:
+        results = play_episodes_lockstep(ai, seed_seq, current_episode, target_episode, LOCKSTEP_GAMES)
+    elif WORKERS > 1:
+        results = play_episodes_parallel(ai, seed_seq, current_episode, target_episode, WORKERS)
+    else:
+        results = (play_episode(ai, episode, seed_seq, replay) for episode in range(current_episode, target_episode))
 
-        current_episode += 1  
+    for score, max_tile, moves_count, game_duration, final_board in results:
+        current_episode += 1
 
-        game_duration = time.time() - game_start_time
         log_entry = [
             current_episode,
-            game.score,
-            np.max(game.board),
+            score,
+            max_tile,
             moves_count,
             round(game_duration, 4),
             round(ai.weights_normal[0], 5), round(ai.weights_normal[1], 5),
@@ -183,8 +585,8 @@ def train():
         ]
         csv_buffer.append(log_entry)
 
-        scores_history.append(game.score)
-        max_tiles_history.append(np.max(game.board))
+        scores_history.append(score)
+        max_tiles_history.append(max_tile)
 
         if len(scores_history) > 100:
             scores_history.pop(0)
@@ -192,7 +594,7 @@ def train():
 
         
         if current_episode % 200 == 0:
-            ai.save_model(CHECKPOINT_FILE, current_episode)
+            ai.save_model(CHECKPOINT_FILE, current_episode, training_config(seed_seq), writer)
             save_logs_to_csv(csv_buffer, LOG_FILE) 
             csv_buffer = [] 
 
@@ -209,13 +611,14 @@ def train():
             print(f"Wagi PANIC : E={ai.weights_panic[0]:.2f}, M={ai.weights_panic[1]:.2f}, S={ai.weights_panic[2]:.2f}, Mrg={ai.weights_panic[3]:.2f}, Crn={ai.weights_panic[4]:.2f}, Ngh={ai.weights_panic[5]:.2f}")
 
             print("Ostatnia plansza:")
-            print(game.board)
+            print(final_board)
             print("-" * 40)
 
     if csv_buffer:
         save_logs_to_csv(csv_buffer, LOG_FILE)
 
-    ai.save_model(CHECKPOINT_FILE, current_episode)
+    ai.save_model(CHECKPOINT_FILE, current_episode, training_config(seed_seq), writer)
+    writer.wait()
 
 if __name__ == "__main__":
     train()
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Moduł z ograniczoną tablicą transpozycji (cache ocen plansz) z wypieraniem LRU.
+"""
+from collections import OrderedDict
+from game_bitboard import canonical_bitboard
+
+ENTRY_BYTES = 168
+
+
+class TranspositionTable:
+    """
+    Cache wartości plansz o ograniczonym rozmiarze, z wypieraniem najdawniej używanych (LRU).
+
+    Kluczem jest plansza spakowana do 64 bitów połączona z głębokością
+    przeszukiwania: `(głębokość << 64) | plansza`. Limit pamięci jest
+    przeliczany na liczbę wpisów według szacunku `ENTRY_BYTES` na wpis.
+
+    Attributes:
+        max_entries (int): Maksymalna liczba przechowywanych wpisów.
+        canonical (bool): Czy plansze są sprowadzane do postaci kanonicznej
+            (8 symetrii dzieli jeden wpis). Ocena jest symetryczna z dokładnością
+            do remisów przy wyborze pozycji największego klocka.
+        hits (int): Liczba trafień.
+        misses (int): Liczba chybień.
+        evictions (int): Liczba wypartych wpisów.
+
+    Args:
+        max_mb (float): Limit pamięci w MB.
+        canonical (bool): Patrz atrybut `canonical`.
+    """
+    def __init__(self, max_mb=64, canonical=False):
+        self.max_entries = max(1, int(max_mb * 1024 * 1024 / ENTRY_BYTES))
+        self.canonical = canonical
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, bb, depth=0):
+        """
+        Buduje klucz wpisu.
+
+        Args:
+            bb (int): Plansza spakowana do 64 bitów.
+            depth (int): Głębokość przeszukiwania, dla której liczona jest wartość.
+
+        Returns:
+            int: Klucz tablicy.
+        """
+        if self.canonical:
+            bb = canonical_bitboard(bb)[0]
+        return (depth << 64) | bb
+
+    def get(self, key):
+        """
+        Zwraca zapamiętaną wartość i oznacza wpis jako ostatnio używany.
+
+        Args:
+            key (int): Klucz z `key`.
+
+        Returns:
+            float | None: Wartość lub None przy chybieniu.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Zapisuje wartość, wypierając najdawniej używany wpis po przekroczeniu limitu.
+
+        Args:
+            key (int): Klucz z `key`.
+            value (float): Wartość do zapamiętania.
+        """
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Usuwa wszystkie wpisy (liczniki pozostają)."""
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Zwraca statystyki tablicy.
+
+        Returns:
+            dict: Klucze 'entries', 'hits', 'misses', 'evictions', 'hit_rate'.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }